@@ -5,25 +5,94 @@ from pptx.enum.text import MSO_AUTO_SIZE
 
 from helpers.exceptions import TemplateError
 from helpers.utils import (
-    _add_bullet,
-    _add_section_header,
+    _JSON_SCALARS,
+    BulletBuffer,
     _find_shape_with_token,
+    _format_kv_line,
     _load_json,
     _replace_company_name_everywhere,
 )
 
 
-def fill_company_research1(prs: Presentation, payload: dict):
+def _emit_items(buf, items):
+    """Emit list items as level-1 bullets; dict items are compacted as 'k: v; ...'."""
+    # Local aliases: LOAD_FAST instead of LOAD_GLOBAL/LOAD_ATTR per item
+    add_bullet, format_kv_line, _isinstance, _str = buf.add_bullet, _format_kv_line, isinstance, str
+    for item in items:
+        if type(item) is dict or _isinstance(item, dict):
+            add_bullet(format_kv_line(item), level=1, size=12)
+        else:
+            add_bullet(_str(item), level=1, size=12)
+
+
+def _emit_field_list(buf, key, value):
+    # list of dicts or primitives
+    buf.add_bullet(f"{key}:", level=0, size=14)
+    _emit_items(buf, value)
+
+
+def _emit_field_dict(buf, key, value):
+    # one more level
+    add_bullet = buf.add_bullet
+    add_bullet(f"{key}:", level=0, size=14)
+    for kk, vv in value.items():
+        add_bullet(f"{kk}: {vv}", level=1, size=12)
+
+
+def _emit_field_scalar(buf, key, value):
+    buf.add_bullet(f"{key}: {value}", level=0, size=14)
+
+
+def _emit_section_dict(buf, key, value):
+    # dict: sub-keys as bullets
+    buf.add_section_header(f"{key}:")
+    lookup, resolve, table = _FIELD_DISPATCH.get, _resolve_emitter, _FIELD_DISPATCH
+    for k2, v2 in value.items():
+        emit = lookup(type(v2)) or resolve(table, v2, _emit_field_scalar)
+        emit(buf, k2, v2)
+
+
+def _emit_section_list(buf, key, value):
+    # list at root level
+    buf.add_section_header(f"{key}:")
+    _emit_items(buf, value)
+
+
+# Type-keyed dispatch: one dict lookup per field instead of an isinstance() ladder.
+# JSON scalars are seeded up front so the common case never misses; any other
+# type is resolved once by _resolve_emitter and memoized in the table.
+_FIELD_DISPATCH = {dict: _emit_field_dict, list: _emit_field_list, **dict.fromkeys(_JSON_SCALARS, _emit_field_scalar)}
+_SECTION_DISPATCH = {
+    dict: _emit_section_dict,
+    list: _emit_section_list,
+    **dict.fromkeys(_JSON_SCALARS, _emit_field_scalar),
+}
+
+
+def _resolve_emitter(table: dict, value, default):
+    """Resolve the emitter for a type missing from `table` (dict/list subclasses, scalars) and cache it."""
+    t = type(value)
+    emit = default
+    if issubclass(t, dict):
+        emit = table[dict]
+    elif issubclass(t, list):
+        emit = table[list]
+    table[t] = emit
+    return emit
+
+
+def fill_company_research1(prs: Presentation, payload: dict, shape_index: dict | None = None):
     """
     Fills the CompanyResearch1 section with bullet points from objects/lists.
 
     Args:
         prs: PowerPoint Presentation object
         payload: Dictionary containing company research data
+        shape_index: Optional token index from `build_shape_index` to skip rescanning the slides
     """
     token = "{{CompanyResearch1}}"
 
-    slide, shape = _find_shape_with_token(prs, token)
+    slide, shape = _find_shape_with_token(prs, token, shape_index)
     if not shape:
         raise TemplateError(f"Token '{token}' not found in any slide")
 
@@ -35,44 +104,16 @@ def fill_company_research1(prs: Presentation, payload: dict):
         logging.warning("CompanyResearch1 payload is empty; slide will be left blank.")
         return
 
-    # Ignore "Company Name" because the name goes through {{CompanyName}}
-    for key, val in payload.items():
-        if key == "Company Name":
-            continue
-
-        # Section header if the value is complex
-        if isinstance(val, (dict, list)):
-            _add_section_header(tf, f"{key}:")
-            if isinstance(val, dict):
-                # dict: sub-keys as bullets
-                for k2, v2 in val.items():
-                    if isinstance(v2, list):
-                        _add_bullet(tf, f"{k2}:", level=0, size=14)
-                        # list of dicts or primitives
-                        for item in v2:
-                            if isinstance(item, dict):
-                                line = "; ".join(f"{kk}: {vv}" for kk, vv in item.items())
-                                _add_bullet(tf, line, level=1, size=12)
-                            else:
-                                _add_bullet(tf, str(item), level=1, size=12)
-                    elif isinstance(v2, dict):
-                        # one more level
-                        _add_bullet(tf, f"{k2}:", level=0, size=14)
-                        for kk, vv in v2.items():
-                            _add_bullet(tf, f"{kk}: {vv}", level=1, size=12)
-                    else:
-                        _add_bullet(tf, f"{k2}: {v2}", level=0, size=14)
-            else:
-                # list at root level
-                for item in val:
-                    if isinstance(item, dict):
-                        line = "; ".join(f"{kk}: {vv}" for kk, vv in item.items())
-                        _add_bullet(tf, line, level=1, size=12)
-                    else:
-                        _add_bullet(tf, str(item), level=1, size=12)
-        else:
-            # simple value
-            _add_bullet(tf, f"{key}: {val}", level=0, size=14)
+    # Ignore "Company Name" because the name goes through {{CompanyName}} (filtered once, not per iteration)
+    items = [(k, v) for k, v in payload.items() if k != "Company Name"]
+    # Bullets are recorded first and written to the text frame in one pass
+    buf = BulletBuffer()
+    lookup, resolve, table = _SECTION_DISPATCH.get, _resolve_emitter, _SECTION_DISPATCH
+    for key, val in items:
+        # Section header if the value is complex, otherwise a simple value bullet
+        emit = lookup(type(val)) or resolve(table, val, _emit_field_scalar)
+        emit(buf, key, val)
+    buf.flush(tf)
 
 
 # --------------------------------------------------------------------
@@ -98,7 +139,7 @@ def _get_company_name_from_json(path_or_obj) -> str:
         raise ValueError("Company JSON missing expected 'Company Name' field") from exc
 
 
-def fill_company_name_from_json(prs: Presentation, company_json_path: str):
+def fill_company_name_from_json(prs: Presentation, company_json_path: str, shape_index: dict | None = None):
     # Let any error propagate so callers can handle/log it appropriately
     name = _get_company_name_from_json(company_json_path)
-    _replace_company_name_everywhere(prs, name)
+    _replace_company_name_everywhere(prs, name, shape_index)
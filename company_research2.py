@@ -3,23 +3,52 @@ from pptx.enum.text import MSO_AUTO_SIZE
 
 from helpers.exceptions import TemplateError
 from helpers.utils import (
+    Run,
     _add_bullet_runs,
     _choose_link,
-    _deep_find,
+    _find_in_flat,
     _find_shape_with_token,
+    _flatten_normalized,
     _fmt_billions_usd,
-    _get_first_str,
-    _norm,
+    _get_first_str_normed,
+    _norm_items,
     _parse_date,
     _parse_number,
     _parse_percent,
 )
 
+# Sinónimos de claves (tuplas a nivel de módulo: sin listas nuevas por llamada)
+_COMPANY_NAME_KEYS = ("Company Name", "Name", "Company")
+_REVENUE_KEYS = ("revenue", "sales", "total revenue", "latest revenue", "annual revenue")
+_INDUSTRY_GM_KEYS = ("industry average gross margin", "industry gross margin", "industry avg")
+_COMPANY_GM_KEYS = ("company gross margin", "gross margin")
+_EMP_KEYS = ("employee count", "headcount", "employees")
+_AMOUNT_KEYS = ("amount", "value", "revenue", "sales")
+_FY_KEYS = ("fiscal year close date", "fiscal year", "as of", "date")
+_ASOF_KEYS = ("as of", "date", "fiscal year close date", "fiscal year")
+_INDUSTRY_NAME_KEYS = ("industry", "sector")
+_GM_AVG_KEYS = ("average gross margin", "gross margin", "avg", "average")
+_GM_KEYS = ("gross margin", "margin")
+_HEADCOUNT_KEYS = ("headcount", "employees", "employee count", "count", "total")
+
+
+# Runs fijos compartidos (inmutables): no se crea un objeto por bullet
+_RUN_OPEN = Run("(")
+_RUN_CLOSE = Run(").")
+_RUN_PERIOD = Run(".")
+
+
+def _source_runs(link: str | None) -> tuple[Run, ...]:
+    """Cierre del bullet: ' (link).' si hay fuente, '.' si no."""
+    return (_RUN_OPEN, Run(link, link), _RUN_CLOSE) if link else (_RUN_PERIOD,)
+
 
 # --------------------------------------------------------------------
 # Función 2: {{CompanyResearch2}}  (tabla de métricas clave)
 # --------------------------------------------------------------------
-def fill_company_research2(prs: Presentation, payload: dict, company_name: str | None = None):
+def fill_company_research2(
+    prs: Presentation, payload: dict, company_name: str | None = None, shape_index: dict | None = None
+):
     """
     Genera bullets estilo narrativa, tolerante a cambios de claves/estructura.
     Detecta Revenue, Industry Avg Gross Margin, Company Gross Margin, Employee Count.
@@ -27,14 +56,14 @@ def fill_company_research2(prs: Presentation, payload: dict, company_name: str |
     """
     token = "{{CompanyResearch2}}"
 
-    slide, shape = _find_shape_with_token(prs, token)
+    slide, shape = _find_shape_with_token(prs, token, shape_index)
     if not shape:
         raise TemplateError(f"Token '{token}' not found in any slide")
 
     # Inferencia de nombre si no llega por parámetro
     if not company_name:
         # prueba con claves típicas
-        for k in ("Company Name", "Name", "Company"):
+        for k in _COMPANY_NAME_KEYS:
             if k in payload and isinstance(payload[k], str) and payload[k].strip():
                 company_name = payload[k].strip()
                 break
@@ -44,17 +73,23 @@ def fill_company_research2(prs: Presentation, payload: dict, company_name: str |
     tf.auto_size = MSO_AUTO_SIZE.TEXT_TO_FIT_SHAPE
     tf.clear()
 
+    # Un solo recorrido del payload para las cuatro búsquedas de abajo
+    flat = _flatten_normalized(payload)
+
     # --- Revenue (busca por revenue/sales/total revenue) ---
-    rev_obj = _deep_find(payload, ["revenue", "sales", "total revenue", "latest revenue", "annual revenue"])
+    rev_obj = _find_in_flat(flat, _REVENUE_KEYS)
     if isinstance(rev_obj, dict):
-        # cantidad
+        # claves normalizadas una sola vez; el primer original gana ante colisiones
+        rev_items = _norm_items(rev_obj)
+        rev_map = {}
+        for nk, v in rev_items:
+            rev_map.setdefault(nk, v)
+
+        # cantidad (el último candidato presente prevalece)
         amount = None
-        for k in ("amount", "value", "revenue", "sales"):
-            if k in {_norm(x) for x in rev_obj.keys()}:
-                for orig_k, v in rev_obj.items():
-                    if _norm(orig_k) == k:
-                        amount = _parse_number(v)
-                        break
+        for k in _AMOUNT_KEYS:
+            if k in rev_map:
+                amount = _parse_number(rev_map[k])
         if amount is None:
             # fallback: busca primer número razonable en el dict
             for v in rev_obj.values():
@@ -66,8 +101,8 @@ def fill_company_research2(prs: Presentation, payload: dict, company_name: str |
 
         # fecha FY
         fy = ""
-        for key in ("fiscal year close date", "fiscal year", "as of", "date"):
-            fy = _get_first_str(rev_obj, [key])
+        for key in _FY_KEYS:
+            fy = _get_first_str_normed(rev_items, (key,))
             if fy:
                 break
         fy_txt = _parse_date(fy) if fy else "the latest fiscal year"
@@ -84,15 +119,8 @@ def fill_company_research2(prs: Presentation, payload: dict, company_name: str |
         _add_bullet_runs(
             tf,
             [
-                {
-                    "text": f"{company_name} reported an annual revenue of {amount_txt} for the fiscal year ending {fy_txt} ",
-                    "link": None,
-                },
-                *(
-                    [{"text": "(", "link": None}, {"text": link_main, "link": link_main}, {"text": ").", "link": None}]
-                    if link_main
-                    else [{"text": ".", "link": None}]
-                ),
+                Run(f"{company_name} reported an annual revenue of {amount_txt} for the fiscal year ending {fy_txt} "),
+                *_source_runs(link_main),
             ],
             level=0,
             size=14,
@@ -103,25 +131,26 @@ def fill_company_research2(prs: Presentation, payload: dict, company_name: str |
             _add_bullet_runs(
                 tf,
                 [
-                    {"text": "Additional filing: ", "link": None, "bold": False},
-                    {"text": link_sec, "link": link_sec},
+                    Run("Additional filing: "),
+                    Run(link_sec, link_sec),
                 ],
                 level=1,
                 size=12,
             )
 
     # --- Industry Average Gross Margin ---
-    ind_gm_obj = _deep_find(payload, ["industry average gross margin", "industry gross margin", "industry avg"])
+    ind_gm_obj = _find_in_flat(flat, _INDUSTRY_GM_KEYS)
+    gm_avg = None
     if isinstance(ind_gm_obj, dict):
+        ind_items = _norm_items(ind_gm_obj)
         industry = ""
-        for key in ("industry", "sector"):
-            s = _get_first_str(ind_gm_obj, [key])
+        for key in _INDUSTRY_NAME_KEYS:
+            s = _get_first_str_normed(ind_items, (key,))
             if s:
                 industry = s
                 break
-        gm_avg = None
-        for key in ("average gross margin", "gross margin", "avg", "average"):
-            s = _get_first_str(ind_gm_obj, [key])
+        for key in _GM_AVG_KEYS:
+            s = _get_first_str_normed(ind_items, (key,))
             if s:
                 gm_avg = _parse_percent(s)
                 break
@@ -132,80 +161,60 @@ def fill_company_research2(prs: Presentation, payload: dict, company_name: str |
         _add_bullet_runs(
             tf,
             [
-                {
-                    "text": f'The industry average gross margin for the "{industry or "industry"}" industry is approximately {gm_txt} ',
-                    "link": None,
-                },
-                *(
-                    [{"text": "(", "link": None}, {"text": link_ind, "link": link_ind}, {"text": ").", "link": None}]
-                    if link_ind
-                    else [{"text": ".", "link": None}]
+                Run(
+                    f'The industry average gross margin for the "{industry or "industry"}" industry is approximately {gm_txt} '
                 ),
+                *_source_runs(link_ind),
             ],
             level=0,
             size=14,
         )
 
     # --- Company Gross Margin ---
-    comp_gm_obj = _deep_find(payload, ["company gross margin", "gross margin"])
+    comp_gm_obj = _find_in_flat(flat, _COMPANY_GM_KEYS)
     if isinstance(comp_gm_obj, dict):
+        cmp_items = _norm_items(comp_gm_obj)
         gm = None
-        for key in ("gross margin", "margin"):
-            s = _get_first_str(comp_gm_obj, [key])
+        for key in _GM_KEYS:
+            s = _get_first_str_normed(cmp_items, (key,))
             if s:
                 gm = _parse_percent(s)
                 break
         gm_txt = f"{gm:.2f}%" if gm is not None else "an unspecified value"
 
         fy = ""
-        for key in ("fiscal year close date", "fiscal year", "as of", "date"):
-            fy = _get_first_str(comp_gm_obj, [key])
+        for key in _FY_KEYS:
+            fy = _get_first_str_normed(cmp_items, (key,))
             if fy:
                 break
         fy_txt = _parse_date(fy) if fy else "the latest fiscal year"
 
         link_cmp = _choose_link(comp_gm_obj.get("Source"), comp_gm_obj.get("URL"), comp_gm_obj)
 
-        # si tenemos industry avg, comparamos
+        # si tenemos industry avg, comparamos (gm_avg ya calculado arriba)
         tail = ""
-        try:
-            ind_val = None
-            for key in ("average gross margin", "gross margin", "avg", "average"):
-                s = _get_first_str(ind_gm_obj or {}, [key])
-                if s:
-                    ind_val = _parse_percent(s)
-                    break
-            if ind_val is not None and gm is not None and abs(ind_val - gm) < 1e-6:
-                tail = ", matching the industry average"
-        except Exception:
-            pass
+        if gm_avg is not None and gm is not None and abs(gm_avg - gm) < 1e-6:
+            tail = ", matching the industry average"
 
         _add_bullet_runs(
             tf,
             [
-                {
-                    "text": f"The company's gross margin for the fiscal year ending {fy_txt} was {gm_txt}{tail} ",
-                    "link": None,
-                },
-                *(
-                    [{"text": "(", "link": None}, {"text": link_cmp, "link": link_cmp}, {"text": ").", "link": None}]
-                    if link_cmp
-                    else [{"text": ".", "link": None}]
-                ),
+                Run(f"The company's gross margin for the fiscal year ending {fy_txt} was {gm_txt}{tail} "),
+                *_source_runs(link_cmp),
             ],
             level=0,
             size=14,
         )
 
     # --- Employee Count / Headcount ---
-    emp_obj = _deep_find(payload, ["employee count", "headcount", "employees"])
+    emp_obj = _find_in_flat(flat, _EMP_KEYS)
     if isinstance(emp_obj, dict):
+        emp_items = _norm_items(emp_obj)
         headcount = None
         # busca número
-        for k in emp_obj.keys():
-            nk = _norm(k)
-            if any(s in nk for s in ["headcount", "employees", "employee count", "count", "total"]):
-                headcount = emp_obj[k]
+        for nk, v in emp_items:
+            if any(s in nk for s in _HEADCOUNT_KEYS):
+                headcount = v
                 break
         # formateo
         if isinstance(headcount, (int, float)):
@@ -217,8 +226,8 @@ def fill_company_research2(prs: Presentation, payload: dict, company_name: str |
         hc_txt = hc_txt.replace(",", ",")  # miles estándar
 
         asof = ""
-        for key in ("as of", "date", "fiscal year close date", "fiscal year"):
-            asof = _get_first_str(emp_obj, [key])
+        for key in _ASOF_KEYS:
+            asof = _get_first_str_normed(emp_items, (key,))
             if asof:
                 break
         asof_txt = _parse_date(asof) if asof else "the stated date"
@@ -228,12 +237,8 @@ def fill_company_research2(prs: Presentation, payload: dict, company_name: str |
         _add_bullet_runs(
             tf,
             [
-                {"text": f"The company had {hc_txt} employees as of {asof_txt} ", "link": None},
-                *(
-                    [{"text": "(", "link": None}, {"text": link_emp, "link": link_emp}, {"text": ").", "link": None}]
-                    if link_emp
-                    else [{"text": ".", "link": None}]
-                ),
+                Run(f"The company had {hc_txt} employees as of {asof_txt} "),
+                *_source_runs(link_emp),
             ],
             level=0,
             size=14,
@@ -1,28 +1,243 @@
 import logging
+import re
+from functools import lru_cache
+from itertools import zip_longest
 
 from pptx import Presentation
 from pptx.enum.text import MSO_AUTO_SIZE
 
 from helpers.exceptions import TemplateError
 from helpers.utils import (
-    _add_bullet,
-    _add_bullet_runs,
-    _add_section_header,
-    _extract_urls,
+    _JSON_SCALARS,
+    BulletBuffer,
+    Run,
+    _add_blank_slide,
     _find_shape_with_token,
     _is_url,
+    _iter_urls,
     _norm,
     _parse_date,
 )
 
+# Las mismas fechas crudas (FY, "as of") se repiten entre ítems y secciones
+_parse_date_cached = lru_cache(maxsize=1024)(_parse_date)
+
+_LINK_LABEL = Run("link: ")
+
+
+def _any_word_re(*words: str) -> re.Pattern:
+    """Una sola búsqueda en C equivalente a `any(w in nk for w in words)`."""
+    return re.compile("|".join(map(re.escape, words)))
+
+
+_LIST_KEY_RE = _any_word_re("list", "items", "entries", "highlights", "data", "points")
+_TITLE_KEY_RE = _any_word_re("title", "name", "headline", "subject", "summary", "objective")
+# Tope de _score_main_kv (string de 200+ chars en clave título-like): nada lo supera
+_MAX_MAIN_SCORE = 1.0 + 0.3
+_SUMMARY_KEY_RE = _any_word_re("summary", "description", "details", "overview")
+_DATE_KEY_RE = _any_word_re("date", "as of", "fiscal year", "fy")
+_URL_KEY_RE = _any_word_re("url", "link", "source", "reference")
+_META_DATE_KEY_RE = _any_word_re("fiscal year", "as of", "date")
+
+# Bits de _key_flags: qué patrones matchean una clave normalizada
+_KEY_TITLE, _KEY_SUMMARY, _KEY_DATE, _KEY_URL, _KEY_LIST, _KEY_META_DATE = 1, 2, 4, 8, 16, 32
+
+
+@lru_cache(maxsize=8192)
+def _key_flags(nk: str) -> int:
+    """Bitmask de los patrones de clave; las regex corren una sola vez por clave distinta."""
+    flags = 0
+    if _TITLE_KEY_RE.search(nk):
+        flags |= _KEY_TITLE
+    if _SUMMARY_KEY_RE.search(nk):
+        flags |= _KEY_SUMMARY
+    if _DATE_KEY_RE.search(nk):
+        flags |= _KEY_DATE
+    if _URL_KEY_RE.search(nk):
+        flags |= _KEY_URL
+    if _LIST_KEY_RE.search(nk):
+        flags |= _KEY_LIST
+    if _META_DATE_KEY_RE.search(nk):
+        flags |= _KEY_META_DATE
+    return flags
+
+
+# Clasificación por tipo exacto: un lookup + comparación de enteros en vez de la escalera de isinstance()
+_KIND_SCALAR, _KIND_DICT, _KIND_LIST = 0, 1, 2
+_KIND = {dict: _KIND_DICT, list: _KIND_LIST, **dict.fromkeys(_JSON_SCALARS, _KIND_SCALAR)}
+
+
+# Render de un valor, resuelto una vez al ordenar subclaves (ver _emit_kind)
+_EMIT_SKIP, _EMIT_LIST, _EMIT_DICT, _EMIT_URL, _EMIT_LEAF = range(5)
+
+# Tipos exactos de una lista "de primitivas" (bool entra por ser subclase de int, como en isinstance)
+_LIST_PRIMITIVES = frozenset((str, int, float, bool))
+_JSON_TYPES = frozenset((*_JSON_SCALARS, dict, list))
+
+
+def _is_primitive_list(value) -> bool:
+    """`all(isinstance(x, (str, int, float)) for x in value)` resuelto sobre el set de tipos exactos."""
+    types = {type(x) for x in value}
+    if types <= _LIST_PRIMITIVES:
+        return True
+    if types <= _JSON_TYPES:
+        return False  # hay dict/list/None
+    return all(isinstance(x, (str, int, float)) for x in value)  # subclases: chequeo completo
+
+
+def _kind_slow(value) -> int:
+    """Fallback for types outside `_KIND` (dict/list subclasses, other scalars)."""
+    if isinstance(value, dict):
+        return _KIND_DICT
+    if isinstance(value, list):
+        return _KIND_LIST
+    return _KIND_SCALAR
+
+
+def _fmt_date_leaf(value) -> str:
+    return _parse_date_cached(value) if isinstance(value, str) else str(value)
+
+
+@lru_cache(maxsize=1024)
+def _leaf_formatter(label: str):
+    """Resolve the leaf formatter for a field label once: date-like labels get `_parse_date` (cached), others `str`."""
+    nk = _norm(label)
+    return _fmt_date_leaf if _key_flags(nk) & _KEY_DATE else str
+
+
+# Análisis de ítems (sin estado del slide: a nivel de módulo, no se recrean en cada llamada)
+def _score_main_kv(k, v, is_url):
+    """
+    Puntúa un par clave/valor para elegir la línea principal de un ítem:
+    - Prefiere strings más largas
+    - Le da un pequeño bonus a claves "título-like" (title/name/headline/summary)
+    - Penaliza URLs puras (`is_url` ya calculado por el llamador)
+    """
+    if isinstance(v, str):
+        if is_url:
+            return 0.5  # URLs no son buen título
+        base = min(len(v.strip()), 200) / 200.0  # normaliza por longitud
+    elif isinstance(v, (int, float)):
+        base = 0.4
+    elif isinstance(v, dict):
+        base = 0.3
+    elif isinstance(v, list):
+        base = 0.35
+    else:
+        base = 0.2
+
+    nk = _norm(k)
+    if _key_flags(nk) & _KEY_TITLE:
+        base += 0.3
+    return base
+
+
+def _choose_main_text(item_dict):
+    """
+    Elige texto principal del ítem sin depender de nombres fijos:
+    - Máxima puntuación por _score_main_kv
+    - Si no hay strings útiles, compacta como "k: v; ..."
+    """
+    # flag de URL una sola vez por valor: lo usan el scoring y el fallback
+    return _pick_main_text(item_dict, [(k, v, _is_url(v)) for k, v in item_dict.items()])
+
+
+def _main_text_and_urls(item_dict):
+    """
+    `_choose_main_text` + `_extract_urls` en una sola pasada sobre el ítem:
+    los flags de URL del primer nivel se reutilizan para juntar los links.
+    """
+    flagged = [(k, v, _is_url(v)) for k, v in item_dict.items()]
+    urls = []
+    for _, v, u in flagged:
+        if u:
+            urls.append(v)
+        elif isinstance(v, (dict, list)):
+            urls.extend(_iter_urls(v))
+    mk, mv = _pick_main_text(item_dict, flagged)
+    return mk, mv, urls
+
+
+def _pick_main_text(item_dict, flagged):
+    """Núcleo de `_choose_main_text` sobre los pares ya marcados (clave, valor, es_url)."""
+    best_k, best_v, best_score = None, None, -1.0
+    for k, v, u in flagged:
+        sc = _score_main_kv(k, v, u)
+        if sc > best_score:
+            best_k, best_v, best_score = k, v, sc
+            if sc >= _MAX_MAIN_SCORE:
+                break  # con `>` estricto ningún par siguiente puede desplazarlo
+
+    if isinstance(best_v, str) and best_v.strip():
+        return best_k, best_v.strip()
+    # si el "mejor" no es string, intentar otra string decente
+    for k, v, u in flagged:
+        if not u and isinstance(v, str) and v.strip():
+            return k, v.strip()
+    # último recurso: compactar el dict
+    try:
+        return best_k, "; ".join(f"{k}: {v}" for k, v in item_dict.items() if v not in (None, ""))
+    except Exception:
+        # fallback duro
+        return best_k, str(next(iter(item_dict.values()), ""))
+
+
+def _key_priority(nk, is_url):
+    """
+    Orden genérico de subcampos:
+    0: summary/description
+    1: fechas (date/as of/fiscal)
+    2: valores "normales" (texto/números)
+    3: URLs y fuentes
+
+    Recibe la clave ya normalizada (`nk`) y si el valor es URL (`is_url`).
+    """
+    flags = _key_flags(nk)
+    if flags & _KEY_SUMMARY:
+        return 0
+    if flags & _KEY_DATE:
+        return 1
+    if is_url or flags & _KEY_URL:
+        return 3
+    return 2
+
+
+def _emit_kind(value, is_url: bool) -> int:
+    """Clasifica cómo se renderiza un valor (saltear / lista / dict / URL / hoja) con un solo recorrido de guards."""
+    if value is None or value == "":  # identidad primero; sin recorrer la tupla (None, "")
+        return _EMIT_SKIP
+    kind = _KIND.get(type(value))
+    if kind is None:
+        kind = _kind_slow(value)
+    if kind == _KIND_LIST:
+        return _EMIT_LIST
+    if kind == _KIND_DICT:
+        return _EMIT_DICT
+    return _EMIT_URL if is_url else _EMIT_LEAF
+
+
+def _order_subkeys(item_dict, main_key_used):
+    # decorate-sort-undecorate: prioridad y clave normalizada se calculan una vez por clave;
+    # el índice conserva el orden original ante empates (como el sort estable).
+    # Devuelve (clave, valor, _emit_kind): el render no vuelve a buscar ni a clasificar el valor
+    decorated = []
+    for i, (k, v) in enumerate(item_dict.items()):
+        if k != main_key_used:
+            nk = _norm(k)
+            u = _is_url(v)
+            decorated.append((_key_priority(nk, u), nk, i, k, v, _emit_kind(v, u)))
+    # ordenar por prioridad (+ alfabético estable)
+    decorated.sort()
+    return [t[3:] for t in decorated]
+
 
 # --------------------------------------------------------------------
 # Función 3 (genérica): {{CompanyResearch3}} -> bullets jerárquicos + links
 # --------------------------------------------------------------------
-def fill_company_research3(prs: Presentation, payload: dict):
+def fill_company_research3(prs: Presentation, payload: dict, shape_index: dict | None = None):
     token = "{{CompanyResearch3}}"
 
-    slide, shape = _find_shape_with_token(prs, token)
+    slide, shape = _find_shape_with_token(prs, token, shape_index)
     if not shape:
         raise TemplateError(f"Token '{token}' not found in any slide")
 
@@ -33,25 +248,25 @@ def fill_company_research3(prs: Presentation, payload: dict):
     # Preserve placeholder geometry to reuse on cloned slides
     base_left, base_top, base_width, base_height = shape.left, shape.top, shape.width, shape.height
 
-    # Gather sections in the original order
-    sections = list(payload.items())
+    # Gather sections in the original order (consumed two at a time below)
+    sections = iter(payload.items())
 
     # Ensure the first slide textbox is ready
     tf_first = shape.text_frame
     tf_first.auto_size = MSO_AUTO_SIZE.TEXT_TO_FIT_SHAPE
     tf_first.clear()
 
-    def _add_slide_after(prs_obj: Presentation, ref_slide, layout):
-        """Add a slide, place it immediately after ref_slide, and clear existing shapes."""
-        new_slide = prs_obj.slides.add_slide(layout)
+    # Position of the token slide, resolved once: inserting after it never shifts it
+    ref_idx = prs.slides.index(slide)
+
+    def _add_slide_after(prs_obj: Presentation, ref_idx: int, layout):
+        """Add a blank slide (no layout placeholders) and move it right after the slide at ref_idx."""
+        # Blank slide (no layout placeholders cloned) so we paste only the new content we add next
+        new_slide = _add_blank_slide(prs_obj, layout)
         sldIdLst = prs_obj.slides._sldIdLst  # reorder to desired position
         new_id = sldIdLst[-1]
         sldIdLst.remove(new_id)
-        ref_idx = list(prs_obj.slides).index(ref_slide)
         sldIdLst.insert(ref_idx + 1, new_id)
-        # Remove any shapes/placeholders so we paste only the new content we add next
-        for shp in list(new_slide.shapes):
-            new_slide.shapes._spTree.remove(shp._element)
         return new_slide
 
     # Helper to get or create target slide/shape for each chunk
@@ -60,11 +275,11 @@ def fill_company_research3(prs: Presentation, payload: dict):
             target_slide = slide
             tf_local = tf_first
         else:
-            target_slide = _add_slide_after(prs, slide, slide.slide_layout)
+            target_slide = _add_slide_after(prs, ref_idx, slide.slide_layout)
             target_shape = target_slide.shapes.add_textbox(base_left, base_top, base_width, base_height)
             tf_local = target_shape.text_frame
             tf_local.auto_size = MSO_AUTO_SIZE.TEXT_TO_FIT_SHAPE
-            tf_local.clear()
+            # un textbox recién creado ya trae un único <a:p/> vacío: no hace falta clear()
             logging.info("CompanyResearch3 added continuation slide #%s", chunk_index + 1)
         return target_slide, tf_local
 
@@ -80,9 +295,7 @@ def fill_company_research3(prs: Presentation, payload: dict):
         if isinstance(section_value, dict):
             # buscar una lista "natural"
             for k, v in section_value.items():
-                if isinstance(v, list) and any(
-                    w in _norm(k) for w in ["list", "items", "entries", "highlights", "data", "points"]
-                ):
+                if isinstance(v, list) and _key_flags(_norm(k)) & _KEY_LIST:
                     return v, section_value
             # si no hubo, tomar la primera lista que aparezca
             for v in section_value.values():
@@ -95,80 +308,6 @@ def fill_company_research3(prs: Presentation, payload: dict):
         else:
             return [{"Value": section_value}], None
 
-    def _score_main_kv(k, v):
-        """
-        Puntúa un par clave/valor para elegir la línea principal de un ítem:
-        - Prefiere strings más largas
-        - Le da un pequeño bonus a claves "título-like" (title/name/headline/summary)
-        - Penaliza URLs puras
-        """
-        if isinstance(v, str):
-            if _is_url(v):
-                return 0.5  # URLs no son buen título
-            base = min(len(v.strip()), 200) / 200.0  # normaliza por longitud
-        elif isinstance(v, (int, float)):
-            base = 0.4
-        elif isinstance(v, dict):
-            base = 0.3
-        elif isinstance(v, list):
-            base = 0.35
-        else:
-            base = 0.2
-
-        nk = _norm(k)
-        if any(w in nk for w in ["title", "name", "headline", "subject", "summary", "objective"]):
-            base += 0.3
-        return base
-
-    def _choose_main_text(item_dict):
-        """
-        Elige texto principal del ítem sin depender de nombres fijos:
-        - Máxima puntuación por _score_main_kv
-        - Si no hay strings útiles, compacta como "k: v; ..."
-        """
-        best_k, best_v, best_score = None, None, -1.0
-        for k, v in item_dict.items():
-            sc = _score_main_kv(k, v)
-            if sc > best_score:
-                best_k, best_v, best_score = k, v, sc
-
-        if isinstance(best_v, str) and best_v.strip():
-            return best_k, best_v.strip()
-        # si el "mejor" no es string, intentar otra string decente
-        for k, v in item_dict.items():
-            if isinstance(v, str) and v.strip() and not _is_url(v):
-                return k, v.strip()
-        # último recurso: compactar el dict
-        try:
-            return best_k, "; ".join(f"{k}: {v}" for k, v in item_dict.items() if v not in (None, ""))
-        except Exception:
-            # fallback duro
-            return best_k, str(next(iter(item_dict.values()), ""))
-
-    def _key_priority(k, v):
-        """
-        Orden genérico de subcampos:
-        0: summary/description
-        1: fechas (date/as of/fiscal)
-        2: valores "normales" (texto/números)
-        3: URLs y fuentes
-        """
-        nk = _norm(k)
-        if any(w in nk for w in ["summary", "description", "details", "overview"]):
-            return 0
-        if any(w in nk for w in ["date", "as of", "fiscal year", "fy"]):
-            return 1
-        if isinstance(v, str) and _is_url(v):
-            return 3
-        if any(w in nk for w in ["url", "link", "source", "reference"]):
-            return 3
-        return 2
-
-    def _order_subkeys(item_dict, main_key_used):
-        keys = [k for k in item_dict.keys() if k != main_key_used]
-        # ordenar por prioridad (+ alfabético estable)
-        return sorted(keys, key=lambda k: (_key_priority(k, item_dict[k]), _norm(k)))
-
     def _section_suffix_from_meta(meta_dict):
         """Si en meta hay FY/As Of/Date, agregar sufijo legible al header."""
         if not isinstance(meta_dict, dict):
@@ -176,82 +315,103 @@ def fill_company_research3(prs: Presentation, payload: dict):
         # elegir la primera fecha razonable
         for k, v in meta_dict.items():
             nk = _norm(k)
-            if isinstance(v, str) and any(w in nk for w in ["fiscal year", "as of", "date"]):
-                nice = _parse_date(v)
+            if isinstance(v, str) and _key_flags(nk) & _KEY_META_DATE:
+                nice = _parse_date_cached(v)
                 if "fiscal year" in nk or nk == "fy":
                     return f" (FY {nice})" if nice else ""
                 return f" ({nice})" if nice else ""
         return ""
 
-    def _emit_value_as_bullets(label, value, level=1):
-        """Render genérico de un valor como bullets/sub-bullets."""
-        if value in (None, ""):
-            return
-
-        # URL pura
-        if isinstance(value, str) and _is_url(value):
-            _add_bullet_runs(tf, [{"text": f"{label}: "}, {"text": value, "link": value}], level=level, size=12)
-            return
-
-        # lista
-        if isinstance(value, list):
-            if all(isinstance(x, (str, int, float)) for x in value):
-                for x in value:
-                    _add_bullet(tf, f"{label}: {x}", level=level, size=12)
-            else:
-                for x in value:
-                    if isinstance(x, dict):
-                        mk, mv = _choose_main_text(x)
-                        _add_bullet(tf, f"{label}: {mv}", level=level, size=12)
-                        # URLs internas
-                        for u in _extract_urls(x):
-                            _add_bullet_runs(tf, [{"text": "link: "}, {"text": u, "link": u}], level=level + 1, size=11)
-                    else:
-                        _add_bullet(tf, f"{label}: {x}", level=level, size=12)
-            return
-
-        # dict
-        if isinstance(value, dict):
-            mk, mv = _choose_main_text(value)
-            # línea principal del sub-dict
-            _add_bullet(tf, f"{label}: {mv}", level=level, size=12)
-            # resto de campos del sub-dict
-            for sk in _order_subkeys(value, mk):
-                sv = value.get(sk)
-                _emit_value_as_bullets(sk, sv, level=level + 1)
-            return
-
-        # string/numérico
-        nk = _norm(label)
-        vtxt = (
-            _parse_date(value)
-            if isinstance(value, str) and any(s in nk for s in ["date", "as of", "fiscal year", "fy"])
-            else str(value)
-        )
-        _add_bullet(tf, f"{label}: {vtxt}", level=level, size=12)
+    def _emit_value_as_bullets(label, value, level=1, kind=None):
+        """
+        Render genérico de un valor como bullets/sub-bullets.
+
+        Recorrido iterativo con pila explícita (pre-orden, mismo orden que la versión recursiva):
+        sin un frame de Python por cada sub-dict y sin límite de profundidad de recursión.
+        `kind` (ver `_emit_kind`) viene de `_order_subkeys`; si es None se calcula acá.
+        """
+        if kind is None:
+            kind = _emit_kind(value, _is_url(value))
+        stack = [(label, value, level, kind)]
+        while stack:
+            label, value, level, kind = stack.pop()
+            if kind == _EMIT_SKIP:
+                continue
+
+            # lista (alias locales: LOAD_FAST en vez de LOAD_GLOBAL/LOAD_DEREF por ítem)
+            if kind == _EMIT_LIST:
+                add_bullet = buf.add_bullet
+                if _is_primitive_list(value):
+                    for x in value:
+                        add_bullet(f"{label}: {x}", level=level, size=12)
+                else:
+                    add_bullet_runs, main_text_and_urls, kind_of = buf.add_bullet_runs, _main_text_and_urls, _KIND.get
+                    for x in value:
+                        x_kind = kind_of(type(x))
+                        if x_kind is None:
+                            x_kind = _kind_slow(x)
+                        if x_kind == _KIND_DICT:
+                            mk, mv, x_urls = main_text_and_urls(x)
+                            add_bullet(f"{label}: {mv}", level=level, size=12)
+                            # URLs internas
+                            for u in x_urls:
+                                add_bullet_runs((_LINK_LABEL, Run(u, u)), level=level + 1, size=11)
+                        else:
+                            add_bullet(f"{label}: {x}", level=level, size=12)
+                continue
+
+            # dict
+            if kind == _EMIT_DICT:
+                mk, mv = _choose_main_text(value)
+                # línea principal del sub-dict
+                buf.add_bullet(f"{label}: {mv}", level=level, size=12)
+                # resto de campos del sub-dict: se apilan invertidos para salir en orden
+                child_level = level + 1
+                stack.extend(
+                    reversed([(sk, sv, child_level, sk_kind) for sk, sv, sk_kind in _order_subkeys(value, mk)])
+                )
+                continue
+
+            # URL pura
+            if kind == _EMIT_URL:
+                buf.add_bullet_runs((Run(f"{label}: "), Run(value, value)), level=level, size=12)
+                continue
+
+            # string/numérico (formateador resuelto una vez por etiqueta)
+            buf.add_bullet(f"{label}: {_leaf_formatter(label)(value)}", level=level, size=12)
 
     # -------- recorrido genérico de secciones (en orden de aparición) --------
     # Render two section headers per slide (generic, no hardcoded titles)
-    for idx in range(0, len(sections), 2):
-        _, tf = _get_target_tf(idx // 2)
-        for section_name, section_value in sections[idx : idx + 2]:
+    # zip_longest sobre el mismo iterador arma los pares sin copiar slices; el fill None marca cantidad impar
+    for chunk_index, pair in enumerate(zip_longest(sections, sections)):
+        _, tf = _get_target_tf(chunk_index)
+        buf = BulletBuffer()  # _emit_value_as_bullets lo toma del closure
+        for section in pair:
+            if section is None:
+                break
+            section_name, section_value = section
             items, meta = _section_items(section_value)
             suffix = _section_suffix_from_meta(meta)
-            _add_section_header(tf, f"{section_name}{suffix}:")
+            buf.add_section_header(f"{section_name}{suffix}:")
 
             for it in items:
-                if isinstance(it, dict):
+                kind = _KIND.get(type(it))
+                if kind is None:
+                    kind = _kind_slow(it)
+                if kind == _KIND_DICT:
                     mk, mv = _choose_main_text(it)
-                    _add_bullet(tf, mv, level=0, size=14)
+                    buf.add_bullet(mv, level=0, size=14)
 
                     # subcampos del ítem
-                    for sk in _order_subkeys(it, mk):
-                        sv = it.get(sk)
-                        _emit_value_as_bullets(sk, sv, level=1)
-                elif isinstance(it, list):
+                    for sk, sv, sk_kind in _order_subkeys(it, mk):
+                        _emit_value_as_bullets(sk, sv, level=1, kind=sk_kind)
+                elif kind == _KIND_LIST:
                     # lista de primitivas en un ítem
                     for x in it:
-                        _add_bullet(tf, str(x), level=0, size=14)
+                        buf.add_bullet(str(x), level=0, size=14)
                 else:
                     # primitivo
-                    _add_bullet(tf, str(it), level=0, size=14)
+                    buf.add_bullet(str(it), level=0, size=14)
+
+        # los párrafos del slide se escriben de una vez en su text frame
+        buf.flush(tf)
@@ -10,6 +10,17 @@ AZ_STORAGE_CONN_STRING = os.environ.get("AZ_STORAGE_CONN_STRING") or os.environ.
 # Set this environment variable in your Azure Function app settings:
 # BLOB_CONTAINER_NAME: Name of the container to store PowerPoint files (default: "pptx-out")
 AZ_BLOB_CONTAINER_NAME = os.environ.get("BLOB_CONTAINER_NAME", "pptx-out")
+# AZ_SKIP_CONTAINER_CHECK: skip create_container() at client init (default "1"); set "0" to check on cold start
+AZ_SKIP_CONTAINER_CHECK = os.environ.get("AZ_SKIP_CONTAINER_CHECK", "1") != "0"
+# Decks above a single put are uploaded as staged blocks, several in flight at once
+AZ_BLOB_MAX_SINGLE_PUT_SIZE = 8 * 1024 * 1024
+AZ_BLOB_MAX_BLOCK_SIZE = 4 * 1024 * 1024
+AZ_BLOB_UPLOAD_CONCURRENCY = 8
+# Keep-alive pool sized above the upload concurrency so block uploads never wait for a socket
+AZ_BLOB_POOL_SIZE = 2 * AZ_BLOB_UPLOAD_CONCURRENCY
+# Transport timeouts (seconds); 60 s read matches the storage SDK's own READ_TIMEOUT
+AZ_BLOB_CONNECTION_TIMEOUT_S = 5
+AZ_BLOB_READ_TIMEOUT_S = 60
 
 # Azure Blob Table Storage Name
 AZ_BLOB_TABLE_NAME = "pptxactivity"
@@ -24,6 +35,9 @@ EMU_PER_INCH = 914400
 
 # Industry continuation table uplift (inches) to reclaim title space on continuation slides
 INDUSTRY_CONTINUATION_UPLIFT_INCH = 0.4
+# INDUSTRY_MAX_SLIDES: cap on IndustryResearch table slides (first + continuations); extra rows are dropped
+# with a warning. "0" disables the cap.
+INDUSTRY_MAX_SLIDES = int(os.environ.get("INDUSTRY_MAX_SLIDES", "50"))
 
 INPUT_TEMPLATE = "template/plantilla.pptx"
 
@@ -42,10 +56,13 @@ MULTILINE_CONTENT_FONT_SIZE_PT = 10
 SIMPLE_CONTENT_FONT_SIZE_PT = 10
 
 
-def get_next_output_filename():
+def get_next_output_filename(now: datetime | None = None):
     """
     Generates the next available output filename with timestamp for blob storage.
 
+    Args:
+        now: Optional request timestamp to reuse (rendered in local time); defaults to the current time.
+
     Returns:
         str: Next available filename (e.g., "output_20241201_143022.pptx")
     """
@@ -53,7 +70,8 @@ def get_next_output_filename():
     extension = ".pptx"
 
     # Generate timestamp-based filename to ensure uniqueness
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    local_now = now.astimezone() if now is not None else datetime.now()
+    timestamp = local_now.strftime("%Y%m%d_%H%M%S")
     return f"{base_name}_{timestamp}{extension}"
 
 
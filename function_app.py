@@ -4,23 +4,45 @@ import os
 from datetime import datetime, timezone
 from functools import lru_cache
 from io import BytesIO
+from typing import TYPE_CHECKING
 
 import azure.functions as func
-from azure.core.exceptions import ResourceExistsError
-from azure.storage.blob import BlobServiceClient
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
 from pptx import Presentation
 
 from company_research1 import fill_company_name_from_json, fill_company_research1
 from company_research2 import fill_company_research2
 from company_research3 import fill_company_research3
 from config import AZ_STORAGE_CONN_STRING  # may be None in local env
-from config import AZ_BLOB_CONTAINER_NAME, INPUT_TEMPLATE, get_next_output_filename
+from config import (
+    AZ_BLOB_CONNECTION_TIMEOUT_S,
+    AZ_BLOB_CONTAINER_NAME,
+    AZ_BLOB_MAX_BLOCK_SIZE,
+    AZ_BLOB_MAX_SINGLE_PUT_SIZE,
+    AZ_BLOB_POOL_SIZE,
+    AZ_BLOB_READ_TIMEOUT_S,
+    AZ_BLOB_UPLOAD_CONCURRENCY,
+    AZ_SKIP_CONTAINER_CHECK,
+    INPUT_TEMPLATE,
+    get_next_output_filename,
+)
 from helpers.exceptions import AppError, ValidationError
-from helpers.utils import unwrap_first_data
+from helpers.utils import build_shape_index, unwrap_first_data
 from industry_research import fill_industry_slides
 
+if TYPE_CHECKING:
+    from azure.core.pipeline.transport import RequestsTransport
+
+try:  # optional: C JSON encoder for the response bodies (requests stay on req.get_json)
+    import orjson
+except ImportError:  # pragma: no cover - stdlib json fallback
+    orjson = None
+
 app = func.FunctionApp(http_auth_level=func.AuthLevel.ANONYMOUS)
 
+# Request body fields, in the order _validate_request_data returns them
+_REQUIRED_FIELDS = ("CompanyResearchData1", "CompanyResearchData2", "CompanyResearchData3", "IndustryResearch")
+
 
 @lru_cache(maxsize=1)
 def _init_clients():
@@ -29,6 +51,8 @@ def _init_clients():
     Cached as a single tuple to avoid module-level mutable globals.
     """
     conn = _get_conn_string()
+    # Deferred: the blob SDK (~75 ms to import) is only loaded once a client can actually be built
+    from azure.storage.blob import BlobServiceClient
 
     # Table client
     # svc = TableServiceClient.from_connection_string(conn)
@@ -42,8 +66,22 @@ def _init_clients():
     #     raise
 
     # Blob client
-    blob_service_client = BlobServiceClient.from_connection_string(conn)
+    blob_service_client = BlobServiceClient.from_connection_string(
+        conn,
+        transport=_build_blob_transport(),
+        max_single_put_size=AZ_BLOB_MAX_SINGLE_PUT_SIZE,
+        max_block_size=AZ_BLOB_MAX_BLOCK_SIZE,
+    )
     container_client = blob_service_client.get_container_client(container=AZ_BLOB_CONTAINER_NAME)
+    # The container exists after the first deploy; a missing one is created on the first failed upload
+    if not AZ_SKIP_CONTAINER_CHECK:
+        _ensure_container(container_client)
+    # , table_client,
+    return blob_service_client, container_client
+
+
+def _ensure_container(container_client) -> None:
+    """Create the output container, treating 'already exists' as success."""
     try:
         container_client.create_container()
     except ResourceExistsError:
@@ -51,8 +89,38 @@ def _init_clients():
     except Exception:
         logging.exception("Unexpected error creating container")
         raise
-    # , table_client,
-    return blob_service_client, container_client
+
+
+def _build_blob_transport() -> "RequestsTransport":
+    """
+    HTTP transport for the blob client with a larger keep-alive pool than requests' default (10).
+
+    urllib3 already sets TCP_NODELAY on its sockets and the SDK does not send Expect: 100-continue,
+    so the pool size is the only transport knob left to turn.
+    """
+    import requests
+    from azure.core.pipeline.transport import RequestsTransport
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=AZ_BLOB_POOL_SIZE, pool_maxsize=AZ_BLOB_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # A custom transport owns the connection settings: the storage SDK's read timeout (60 s) is not applied
+    # on top of it, so both timeouts are set here
+    return RequestsTransport(
+        session=session,
+        session_owner=False,
+        connection_timeout=AZ_BLOB_CONNECTION_TIMEOUT_S,
+        read_timeout=AZ_BLOB_READ_TIMEOUT_S,
+    )
+
+
+@lru_cache(maxsize=1)
+def _template_bytes() -> bytes:
+    """Read the .pptx template once per worker; each request opens its own Presentation over these bytes."""
+    with open(INPUT_TEMPLATE, "rb") as f:
+        return f.read()
 
 
 def _get_conn_string() -> str:
@@ -83,6 +151,13 @@ def _get_container_client():
     return container_client
 
 
+def _json_body(obj) -> bytes | str:
+    """Serialize a response payload; orjson already yields the UTF-8 bytes HttpResponse sends."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj)
+
+
 def _validate_request_data(req_body: dict) -> tuple[dict, dict, dict, dict, str | None]:
     """
     Validate that all required fields are present and of correct type.
@@ -91,22 +166,14 @@ def _validate_request_data(req_body: dict) -> tuple[dict, dict, dict, dict, str
         Tuple of (company_data1, company_data2, company_data3, industry_data, error_message)
         error_message is None if validation passes.
     """
-    required = ["CompanyResearchData1", "CompanyResearchData2", "CompanyResearchData3", "IndustryResearch"]
-    missing = [k for k in required if k not in req_body]
-    if missing:
+    # Fast path: one lookup per field; the full missing list is only built when reporting an error
+    try:
+        company_data1, company_data2, company_data3, industry_data = [req_body[k] for k in _REQUIRED_FIELDS]
+    except (KeyError, TypeError):
+        missing = [k for k in _REQUIRED_FIELDS if k not in req_body]
         raise ValidationError(f"Missing required files: {', '.join(missing)}")
 
-    company_data1 = req_body["CompanyResearchData1"]
-    company_data2 = req_body["CompanyResearchData2"]
-    company_data3 = req_body["CompanyResearchData3"]
-    industry_data = req_body["IndustryResearch"]
-
-    for name, obj in [
-        ("CompanyResearchData1", company_data1),
-        ("CompanyResearchData2", company_data2),
-        ("CompanyResearchData3", company_data3),
-        ("IndustryResearch", industry_data),
-    ]:
+    for name, obj in zip(_REQUIRED_FIELDS, (company_data1, company_data2, company_data3, industry_data)):
         if not isinstance(obj, dict):
             raise ValidationError(f"Field '{name}' must be a valid JSON object")
 
@@ -123,23 +190,27 @@ def _validate_request_data(req_body: dict) -> tuple[dict, dict, dict, dict, str
 
 def _log_received_data_keys(company_data1: dict, company_data2: dict, company_data3: dict, industry_data: dict) -> None:
     """Log the keys received in each data dictionary."""
-    logging.info("Keys1=%s", list(company_data1.keys()))
-    logging.info("Keys2=%s", list(company_data2.keys()))
-    logging.info("Keys3=%s", list(company_data3.keys()))
-    logging.info("KeysIndustry=%s", list(industry_data.keys()))
+    # Skip building the key lists entirely when INFO is filtered out (production log levels)
+    if not logging.getLogger().isEnabledFor(logging.INFO):
+        return
+    logging.info("Keys1=%s", list(company_data1))
+    logging.info("Keys2=%s", list(company_data2))
+    logging.info("Keys3=%s", list(company_data3))
+    logging.info("KeysIndustry=%s", list(industry_data))
 
 
 def _create_processed_data_summary(
-    company_data1: dict, company_data2: dict, company_data3: dict, industry_data: dict
+    company_data1: dict, company_data2: dict, company_data3: dict, industry_data: dict, now: datetime | None = None
 ) -> dict:
-    """Create a summary dictionary of processed data statistics."""
+    """Create a summary dictionary of processed data statistics (`now`: request timestamp, UTC)."""
+    n1, n2, n3, n_ind = len(company_data1), len(company_data2), len(company_data3), len(industry_data)
     return {
-        "company_data1_processed": len(company_data1),
-        "company_data2_processed": len(company_data2),
-        "company_data3_processed": len(company_data3),
-        "industry_data_processed": len(industry_data),
-        "total_fields": len(company_data1) + len(company_data2) + len(company_data3) + len(industry_data),
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "company_data1_processed": n1,
+        "company_data2_processed": n2,
+        "company_data3_processed": n3,
+        "industry_data_processed": n_ind,
+        "total_fields": n1 + n2 + n3 + n_ind,
+        "timestamp": (now or datetime.now(timezone.utc)).isoformat(),
         "output_location": None,
     }
 
@@ -153,13 +224,15 @@ def _build_presentation(
     Returns:
         Presentation object populated with the data.
     """
-    prs = Presentation(INPUT_TEMPLATE)
+    prs = Presentation(BytesIO(_template_bytes()))
+    # Scan the template once; every fill_* looks its token up here instead of walking all slides
+    shape_index = build_shape_index(prs)
 
-    fill_company_name_from_json(prs, company_data1)
-    fill_company_research1(prs, company_data1)
-    fill_company_research2(prs, company_data2)
-    fill_company_research3(prs, company_data3)
-    fill_industry_slides(prs, industry_data)
+    fill_company_name_from_json(prs, company_data1, shape_index)
+    fill_company_research1(prs, company_data1, shape_index)
+    fill_company_research2(prs, company_data2, shape_index=shape_index)
+    fill_company_research3(prs, company_data3, shape_index)
+    fill_industry_slides(prs, industry_data, shape_index)
 
     return prs
 
@@ -181,7 +254,17 @@ def _upload_presentation_to_blob(buf: BytesIO, output_filename: str) -> str:
     """
     container_client = _get_container_client()
     blob_client = container_client.get_blob_client(blob=output_filename)
-    blob_client.upload_blob(buf.getvalue(), overwrite=True)
+    # Hand the SDK the stream itself: getvalue() would materialize a second full copy of the deck
+    length = buf.seek(0, os.SEEK_END)
+    buf.seek(0)
+    try:
+        blob_client.upload_blob(buf, length=length, overwrite=True, max_concurrency=AZ_BLOB_UPLOAD_CONCURRENCY)
+    except ResourceNotFoundError:
+        # Container missing (startup check skipped): create it once and retry the upload
+        logging.info("Container %s not found; creating it", AZ_BLOB_CONTAINER_NAME)
+        _ensure_container(container_client)
+        buf.seek(0)
+        blob_client.upload_blob(buf, length=length, overwrite=True, max_concurrency=AZ_BLOB_UPLOAD_CONCURRENCY)
 
     account = blob_client.account_name
     blob_url = f"https://{account}.blob.core.windows.net/{AZ_BLOB_CONTAINER_NAME}/{output_filename}"
@@ -212,24 +295,17 @@ def _upload_presentation_to_blob(buf: BytesIO, output_filename: str) -> str:
 #    table_client.create_entity(entity=entity)
 
 
-def _create_success_response(
-    processed_data: dict,
-    company_data1: dict,
-    company_data2: dict,
-    company_data3: dict,
-    industry_data: dict,
-    output_filename: str,
-) -> dict:
-    """Create the success response payload."""
+def _create_success_response(processed_data: dict, output_filename: str) -> dict:
+    """Create the success response payload (sizes come from the summary built by `_create_processed_data_summary`)."""
     return {
         "status": "success",
         "message": "Processed files and saved PPTX to Blob",
         "data": processed_data,
         "files_received": {
-            "CompanyResearchData1_size": len(company_data1),
-            "CompanyResearchData2_size": len(company_data2),
-            "CompanyResearchData3_size": len(company_data3),
-            "IndustryResearch_size": len(industry_data),
+            "CompanyResearchData1_size": processed_data["company_data1_processed"],
+            "CompanyResearchData2_size": processed_data["company_data2_processed"],
+            "CompanyResearchData3_size": processed_data["company_data3_processed"],
+            "IndustryResearch_size": processed_data["industry_data_processed"],
         },
         "output_file": {
             "filename": output_filename,
@@ -243,7 +319,7 @@ def _create_success_response(
 def _create_error_response(error_message: str, status_code: int) -> func.HttpResponse:
     """Create an error HTTP response."""
     return func.HttpResponse(
-        json.dumps({"error": error_message, "status": "error"}),
+        _json_body({"error": error_message, "status": "error"}),
         status_code=status_code,
         mimetype="application/json",
     )
@@ -265,10 +341,12 @@ def agent_httptrigger(req: func.HttpRequest) -> func.HttpResponse:
         _log_received_data_keys(company_data1, company_data2, company_data3, industry_data)
 
         # Create processing summary
-        processed_data = _create_processed_data_summary(company_data1, company_data2, company_data3, industry_data)
+        # One clock read per request, shared by the summary timestamp and the output filename
+        now = datetime.now(timezone.utc)
+        processed_data = _create_processed_data_summary(company_data1, company_data2, company_data3, industry_data, now)
 
         # Build and upload presentation
-        current_output_file = get_next_output_filename()
+        current_output_file = get_next_output_filename(now)
         try:
             prs = _build_presentation(company_data1, company_data2, company_data3, industry_data)
             buf = _save_presentation_to_buffer(prs)
@@ -285,11 +363,9 @@ def agent_httptrigger(req: func.HttpRequest) -> func.HttpResponse:
         #     logging.exception("Error storing data in table: %s", e)
 
         # Create and return success response
-        response_data = _create_success_response(
-            processed_data, company_data1, company_data2, company_data3, industry_data, current_output_file
-        )
+        response_data = _create_success_response(processed_data, current_output_file)
         return func.HttpResponse(
-            json.dumps(response_data),
+            _json_body(response_data),
             status_code=200,
             mimetype="application/json",
         )
@@ -303,3 +379,22 @@ def agent_httptrigger(req: func.HttpRequest) -> func.HttpResponse:
     except Exception as e:
         logging.exception("Unexpected error")
         return _create_error_response(f"Internal server error: {e}", 500)
+
+
+def _warm_up() -> None:
+    """Pay the cold-start costs (template read, client construction) before the first request."""
+    try:
+        _template_bytes()
+        _init_clients()
+    except Exception as e:
+        # Never fail the import: lru_cache does not cache exceptions, so the first request retries
+        logging.warning("Warm-up skipped: %s", e)
+
+
+@app.warm_up_trigger("warmup_context")
+def warmup(warmup_context: func.warmup.WarmUpContext) -> None:
+    """Runs when the platform pre-warms a new instance (Premium/Dedicated plans)."""
+    _warm_up()
+
+
+_warm_up()
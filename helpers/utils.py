@@ -1,23 +1,83 @@
 import json
-import math
 import os
 import re
+import sys
 from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple
+from xml.sax.saxutils import escape as _xml_escape
 
 from pptx import Presentation
 from pptx.enum.text import PP_ALIGN
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls
 from pptx.util import Pt
 
+_URL_PREFIXES = ("http://", "https://")
+# Exact types json.loads produces for scalar values (seed for type-keyed dispatch tables)
+_JSON_SCALARS = (str, int, float, bool, type(None))
+_TOKEN_RE = re.compile(r"\{\{[^{}]*\}\}")
+# Both spellings of the company-name token, replaced in a single scan per paragraph
+_COMPANY_NAME_TOKENS = ("{{CompanyName}}", "{{ CompanyName }}")
+_COMPANY_NAME_RE = re.compile("|".join(map(re.escape, _COMPANY_NAME_TOKENS)))
+# Numeric parsers: compiled once at import instead of going through re's pattern cache per call
+_SCALED_NUMBER_RE = re.compile(r"^\s*\$?\s*([\d\.,]+)\s*(billion|million)\b", re.I)
+_NON_NUMERIC_RE = re.compile(r"[^\d\.\-]")
+_PERCENT_RE = re.compile(r"^\s*([\-]?\d+(\.\d+)?)\s*%?\s*$")
+# _parse_date patterns (no re module cache lookup per call)
+_YYYY_MM_RE = re.compile(r"^\d{4}-\d{2}$")
+_YYYY_RE = re.compile(r"^\d{4}$")
+# Every string datetime.fromisoformat accepts starts like this (YYYY then '-', 'W' or a digit)
+_ISO_PREFIX_RE = re.compile(r"\d{4}[\dW-]", re.ASCII)
+
+# DrawingML fragments for writing bullet paragraphs straight into <a:txBody>
+_P_OPEN = '<a:p><a:pPr algn="l"/>'
+_P_OPEN_LVL = '<a:p><a:pPr algn="l" lvl="%d"/>'
+_RUN_XML = '<a:r><a:rPr sz="%s" b="%s"/><a:t>%s</a:t></a:r>'
+_RUN_SZ_XML = '<a:r><a:rPr sz="%s"/><a:t>%s</a:t></a:r>'
+_LINK_RUN_XML = '<a:r><a:rPr sz="%s" b="%s"><a:hlinkClick r:id="%s"/></a:rPr><a:t>%s</a:t></a:r>'
+_FRAGMENT_XML = "<a:txBody %s>%%s</a:txBody>" % nsdecls("a", "r")
+_LINE_BREAK_RE = re.compile("\n|\v")  # same split python-pptx applies to paragraph text
+_CTRL_CHAR_RE = re.compile(r"([\x00-\x08\x0B-\x1F])")
+
+
+@lru_cache(maxsize=None)
+def _font_attrs(size_pt, bold) -> tuple[str, str]:
+    """Pre-render the <a:rPr> sz/b attribute values for a (size, bold) pair; only a handful of pairs exist."""
+    return str(Pt(size_pt).centipoints), "1" if bold else "0"
+
 
 def _set_font_size(run, size_pt=8, bold=False, color=None):
-    run.font.size = Pt(size_pt)
-    run.font.bold = bold
+    # Same XML as run.font.size/run.font.bold, minus the Length/descriptor round-trip per run
+    sz, b = _font_attrs(size_pt, bold)
+    rPr = run._r.get_or_add_rPr()
+    rPr.set("sz", sz)
+    rPr.set("b", b)
     if color:
         run.font.color.rgb = color
 
 
-def _find_shape_with_token(prs: Presentation, token: str):
-    """Return the first shape in the presentation that contains the token."""
+def build_shape_index(prs: Presentation) -> dict[str, list[tuple]]:
+    """
+    Scan every text shape once and map each {{Token}} found to its (slide, shape) pairs, in document order.
+
+    Build it right after loading the template, before any fill_* call rewrites shape text.
+    """
+    index = {}
+    for slide in prs.slides:
+        for shape in slide.shapes:
+            if getattr(shape, "has_text_frame", False):
+                for token in dict.fromkeys(_TOKEN_RE.findall(shape.text_frame.text)):
+                    index.setdefault(token, []).append((slide, shape))
+    return index
+
+
+def _find_shape_with_token(prs: Presentation, token: str, shape_index: dict | None = None):
+    """Return the first shape in the presentation that contains the token (via `shape_index` when given)."""
+    if shape_index is not None:
+        hits = shape_index.get(token)
+        return hits[0] if hits else (None, None)
     for slide in prs.slides:
         for shape in slide.shapes:
             if getattr(shape, "has_text_frame", False) and token in shape.text_frame.text:
@@ -30,20 +90,45 @@ def _replace_token_in_shape_text(shape, token: str, value: str):
     tf = shape.text_frame
     # Replace across all paragraphs/runs
     for p in tf.paragraphs:
-        new_text = p.text.replace(token, value)
-        if new_text != p.text:
-            p.text = new_text
+        text = p.text
+        if token in text:
+            p.text = text.replace(token, value)
+
 
+def _replace_pattern_in_shape_text(shape, pattern: re.Pattern, value: str):
+    """Same as `_replace_token_in_shape_text`, for every match of `pattern` in one pass."""
+    for p in shape.text_frame.paragraphs:
+        text = p.text
+        if pattern.search(text) is not None:
+            # callable replacement: `value` is inserted literally (no backslash expansion)
+            p.text = pattern.sub(lambda _m: value, text)
 
-def _replace_company_name_everywhere(prs: Presentation, name: str):
+
+def _replace_company_name_everywhere(prs: Presentation, name: str, shape_index: dict | None = None):
     """Replace {{CompanyName}} tokens across all shapes in the presentation."""
-    tokens = ["{{CompanyName}}", "{{ CompanyName }}"]
-    for slide in prs.slides:
-        for shape in slide.shapes:
-            if getattr(shape, "has_text_frame", False):
-                for t in tokens:
-                    if t in shape.text_frame.text:
-                        _replace_token_in_shape_text(shape, t, name)
+    if shape_index is not None:
+        # a shape holding both spellings is listed under each token; rewrite it once
+        shapes = {id(shape): shape for t in _COMPANY_NAME_TOKENS for _, shape in shape_index.get(t, ())}.values()
+    else:
+        shapes = (shape for slide in prs.slides for shape in slide.shapes if getattr(shape, "has_text_frame", False))
+    search = _COMPANY_NAME_RE.search
+    for shape in shapes:
+        # text frame read once per shape; shapes without the token skip the per-paragraph work
+        if search(shape.text_frame.text) is not None:
+            _replace_pattern_in_shape_text(shape, _COMPANY_NAME_RE, name)
+
+
+def _add_blank_slide(prs: Presentation, layout):
+    """
+    `prs.slides.add_slide(layout)` without cloning the layout placeholders.
+
+    For continuation slides whose placeholders would be removed right away; the resulting
+    <p:sld> is the same as add_slide followed by deleting every shape.
+    """
+    slides = prs.slides
+    rId, slide = slides.part.add_slide(layout)
+    slides._sldIdLst.add_sldId(rId)
+    return slide
 
 
 def _remove_shape_and_get_bbox(shape):
@@ -63,7 +148,7 @@ def _add_section_header(tf, title: str):
 
 def _add_bullet(tf, text: str, level: int = 0, size: int = 14):
     p = tf.add_paragraph()
-    p.text = f"• {text}" if not text.startswith("•") else text
+    p.text = "• " + text if not text.startswith("•") else text
     p.alignment = PP_ALIGN.LEFT
     p.level = level
     for run in p.runs:
@@ -77,26 +162,54 @@ def _add_bullet(tf, text: str, level: int = 0, size: int = 14):
 #        return str(n)
 
 
+def _norm_uncached(s) -> str:
+    # str.split() collapses the same (Unicode) whitespace runs as \s+ and drops the ends, without the regex engine
+    return " ".join(str(s or "").split()).lower()
+
+
+# The same payload keys are normalized over and over; typed=True keeps e.g. True and 1 apart
+_norm_memo = lru_cache(maxsize=8192, typed=True)(_norm_uncached)
+
+
 def _norm(s: str) -> str:
-    return re.sub(r"\s+", " ", str(s or "")).strip().lower()
+    try:
+        return _norm_memo(s)
+    except TypeError:  # unhashable input (never a dict key): normalize without caching
+        return _norm_uncached(s)
 
 
 def _is_url(s: str) -> bool:
-    return isinstance(s, str) and s.startswith(("http://", "https://"))
+    # Exact-type check first; isinstance() only runs for non-str values (or str subclasses).
+    # One-char slice compare rejects most plain text before the tuple startswith.
+    return (type(s) is str or isinstance(s, str)) and s[:1] == "h" and s.startswith(_URL_PREFIXES)
 
 
-def _extract_urls(obj) -> list[str]:
-    urls = []
+def _iter_urls(obj):
+    """Yield the URL values of nested dicts in document order (URL strings sitting directly in lists are skipped)."""
     if isinstance(obj, dict):
-        for k, v in obj.items():
-            if _is_url(v):
-                urls.append(v)
-            elif isinstance(v, (dict, list)):
-                urls.extend(_extract_urls(v))
+        stack = [(iter(obj.values()), True)]
     elif isinstance(obj, list):
-        for it in obj:
-            urls.extend(_extract_urls(it))
-    return urls
+        stack = [(iter(obj), False)]
+    else:
+        return
+    # explicit stack of (iterator, is_dict): no per-level list, no recursion
+    while stack:
+        it, in_dict = stack[-1]
+        for v in it:
+            if in_dict and _is_url(v):
+                yield v
+            elif isinstance(v, dict):
+                stack.append((iter(v.values()), True))
+                break
+            elif isinstance(v, list):
+                stack.append((iter(v), False))
+                break
+        else:
+            stack.pop()
+
+
+def _extract_urls(obj) -> list[str]:
+    return list(_iter_urls(obj))
 
 
 def _parse_date(s: str) -> str:
@@ -104,25 +217,26 @@ def _parse_date(s: str) -> str:
     if not isinstance(s, str) or not s.strip():
         return ""
     t = s.strip()
-    # Minimal normalizations
-    try:
-        # ISO completo
-        return datetime.fromisoformat(t).strftime("%B %d, %Y")
-    except Exception:
-        pass
+    n = len(t)
+    # Cheapest checks first; none of YYYY / YYYY-MM is valid ISO, so the order does not change results
+    # YYYY
+    if n == 4 and _YYYY_RE.match(t):
+        try:
+            return datetime(int(t), 12, 31).strftime("%B %d, %Y")
+        except Exception:
+            return t
     # YYYY-MM
-    m = re.match(r"^\d{4}-\d{2}$", t)
-    if m:
+    if n == 7 and _YYYY_MM_RE.match(t):
         try:
             return datetime.fromisoformat(t + "-01").strftime("%B %d, %Y")
         except Exception:
             return t
-    # YYYY
-    if re.match(r"^\d{4}$", t):
+    # ISO completo: only strings with an ISO prefix pay for the try/except
+    if n >= 7 and _ISO_PREFIX_RE.match(t):
         try:
-            return datetime(int(t), 12, 31).strftime("%B %d, %Y")
+            return datetime.fromisoformat(t).strftime("%B %d, %Y")
         except Exception:
-            return t
+            pass
     return t
 
 
@@ -134,17 +248,15 @@ def _parse_number(x):
         return float(x)
     s = str(x)
     # billion/million textuales
-    m = re.match(r"^\s*\$?\s*([\d\.,]+)\s*(billion|million)\b", s, re.I)
+    m = _SCALED_NUMBER_RE.match(s)
     if m:
-        base = (
-            float(m.group(1).replace(".", "").replace(",", "."))
-            if "." not in m.group(1)
-            else float(m.group(1).replace(",", ""))
-        )
-        mult = 1e9 if m.group(2).lower() == "billion" else 1e6
+        num, scale = m.groups()
+        # with a '.' the commas are thousands separators; without one a ',' is the decimal mark
+        base = float(num.replace(",", "")) if "." in num else float(num.replace(",", "."))
+        mult = 1e9 if scale.lower() == "billion" else 1e6
         return base * mult
     # strip symbols
-    s = re.sub(r"[^\d\.\-]", "", s)
+    s = _NON_NUMERIC_RE.sub("", s)
     try:
         return float(s)
     except Exception:
@@ -168,7 +280,12 @@ def _parse_percent(x):
         return float(x)
     s = str(x).strip()
     s = s.replace(",", ".")
-    m = re.match(r"^\s*([\-]?\d+(\.\d+)?)\s*%?\s*$", s)
+    # Fast path for the usual '40.5' / '40.5 %' / '-3%': same grammar as _PERCENT_RE, checked with str methods
+    num = s[:-1].rstrip() if s.endswith("%") else s
+    int_part, dot, frac = (num[1:] if num.startswith("-") else num).partition(".")
+    if int_part.isdecimal() and (not dot or frac.isdecimal()):
+        return float(num)
+    m = _PERCENT_RE.match(s)
     if not m:
         return None
     return float(m.group(1))
@@ -176,109 +293,302 @@ def _parse_percent(x):
 
 def _choose_link(*candidates):
     """Pick a preferred link (prioritize sec.gov when present)."""
-    urls = []
+    first = None
     for c in candidates:
-        if isinstance(c, str) and _is_url(c):
-            urls.append(c)
+        if isinstance(c, str):
+            found = (c,) if _is_url(c) else ()
         elif isinstance(c, (list, dict)):
-            urls.extend([u for u in _extract_urls(c) if _is_url(u)])
-    # prioridad sec.gov
-    for u in urls:
-        if "sec.gov" in u:
-            return u
-    return urls[0] if urls else None
+            found = _iter_urls(c)
+        else:
+            continue
+        for u in found:
+            # prioridad sec.gov: the first one wins, nothing after it needs to be scanned
+            if "sec.gov" in u:
+                return u
+            if first is None:
+                first = u
+    return first
 
 
-def _find_in_dict(d: dict, key_synonyms: list[str]) -> dict | None:
+@lru_cache(maxsize=256)
+def _compile_syns(key_synonyms: tuple[str, ...]):
+    """One alternation regex per synonym tuple: `pat.search(nk)` == `any(s in nk for s in key_synonyms)`."""
+    if not key_synonyms:
+        return re.compile(r"(?!)")  # any(()) is False: never match
+    return re.compile("|".join(map(re.escape, key_synonyms)))
+
+
+def _syn_search(key_synonyms: tuple[str, ...] | list[str]):
+    """Bound `search` of the compiled synonym pattern (lists are accepted and keyed by their tuple)."""
+    return _compile_syns(tuple(key_synonyms)).search
+
+
+def _find_in_dict(d: dict, key_synonyms: tuple[str, ...] | list[str]) -> dict | None:
     """Search current level for a key whose normalized name matches any synonym."""
+    return _find_in_dict_matching(d, _syn_search(key_synonyms))
+
+
+def _find_in_dict_matching(d: dict, search) -> dict | None:
     for k, v in d.items():
-        nk = _norm(k)
-        if any(s in nk for s in key_synonyms):
+        if search(_norm(k)):
             return v if isinstance(v, dict) else {"value": v}
     return None
 
 
-def _deep_find(d: dict, key_synonyms: list[str]) -> dict | None:
-    """Recursive search when not found at the first level."""
-    hit = _find_in_dict(d, key_synonyms)
-    if hit is not None:
-        return hit
+def _deep_find(d: dict, key_synonyms: tuple[str, ...] | list[str], max_depth: int | None = None) -> dict | None:
+    """Nested search when not found at the first level (`max_depth`: nesting levels to descend, None = all)."""
+    # the synonym pattern is compiled (or fetched) once and shared by the whole walk
+    return _deep_find_matching(d, _syn_search(key_synonyms), max_depth)
+
+
+def _deep_find_matching(d: dict, search, max_depth: int | None = None) -> dict | None:
+    # Explicit stack instead of recursion: children are pushed in reverse so dicts are visited
+    # in the same depth-first, document order as the recursive version
+    stack = [(d, 0)]
+    while stack:
+        node, depth = stack.pop()
+        hit = _find_in_dict_matching(node, search)
+        if hit is not None:
+            return hit
+        if max_depth is not None and depth >= max_depth:
+            continue
+        children = []
+        for v in node.values():
+            if isinstance(v, dict):
+                children.append(v)
+            elif isinstance(v, list):
+                children.extend(it for it in v if isinstance(it, dict))
+        child_depth = depth + 1
+        stack.extend((c, child_depth) for c in reversed(children))
+    return None
+
+
+def _flatten_normalized(d: dict) -> list[tuple[str, object]]:
+    """
+    Flatten every (normalized key, value) pair of `d`, at any depth, in `_deep_find` visiting order.
+
+    Lets several `_find_in_flat` lookups share one walk (and one `_norm` per key) of the payload.
+    """
+    flat = [(_norm(k), v) for k, v in d.items()]
     for _, v in d.items():
         if isinstance(v, dict):
-            h = _deep_find(v, key_synonyms)
-            if h is not None:
-                return h
+            flat.extend(_flatten_normalized(v))
         elif isinstance(v, list):
             for it in v:
                 if isinstance(it, dict):
-                    h = _deep_find(it, key_synonyms)
-                    if h is not None:
-                        return h
+                    flat.extend(_flatten_normalized(it))
+    return flat
+
+
+def _find_in_flat(flat: list[tuple[str, object]], key_synonyms: tuple[str, ...] | list[str]) -> dict | None:
+    """Equivalent of `_deep_find` over the output of `_flatten_normalized`."""
+    search = _syn_search(key_synonyms)
+    for nk, v in flat:
+        if search(nk):
+            return v if isinstance(v, dict) else {"value": v}
     return None
 
 
-def _get_first_str(d: dict, key_synonyms: list[str]) -> str:
+def _get_first_str(d: dict, key_synonyms: tuple[str, ...] | list[str]) -> str:
     """Return the first string matching any synonym (depth 1)."""
+    search = _syn_search(key_synonyms)
     for k, v in d.items():
-        if any(s in _norm(k) for s in key_synonyms):
+        if search(_norm(k)):  # once per key, not once per synonym
             if isinstance(v, str):
                 return v
     return ""
 
 
+def _norm_items(d: dict) -> list[tuple[str, object]]:
+    """Normalize the keys of `d` once so several synonym lookups can reuse them."""
+    return [(_norm(k), v) for k, v in d.items()]
+
+
+def _get_first_str_normed(norm_items: list[tuple[str, object]], key_synonyms: tuple[str, ...] | list[str]) -> str:
+    """Same as `_get_first_str` but over pre-normalized `(key, value)` pairs from `_norm_items`."""
+    search = _syn_search(key_synonyms)
+    for nk, v in norm_items:
+        if search(nk):
+            if isinstance(v, str):
+                return v
+    return ""
+
+
+def _format_kv_line(item: dict) -> str:
+    """Compact a dict into a single 'k: v; k2: v2' line (shared by bullets, table cells and row sizing)."""
+    return "; ".join([f"{k}: {v}" for k, v in item.items()])
+
+
+class Run(NamedTuple):
+    """One text run of a bullet for `_add_bullet_runs`; `link` turns it into a hyperlink."""
+
+    text: str
+    link: str | None = None
+    bold: bool = False
+
+
 def _add_bullet_runs(tf, runs, level=0, size=14):
     p = tf.add_paragraph()
     p.alignment = PP_ALIGN.LEFT
     p.level = level
     for piece in runs:
         r = p.add_run()
-        r.text = piece.get("text", "")
-        _set_font_size(r, size_pt=size, bold=piece.get("bold", False))
-        if piece.get("link"):
-            r.hyperlink.address = piece["link"]
+        r.text = piece.text
+        _set_font_size(r, size_pt=size, bold=piece.bold)
+        if piece.link:
+            r.hyperlink.address = piece.link
     return p
 
 
-def estimate_row_height(entry: dict, keys: list, line_height_pt: int, col_width_pt: float) -> float:
-    """Estimate height of the row (in points) based on text length and wrapping."""
+def _escape_run_text(text: str) -> str:
+    """Escape `<a:t>` content: control chars as `_xHHHH_` (like python-pptx), then XML entities."""
+    return _xml_escape(_CTRL_CHAR_RE.sub(lambda m: "_x%04X_" % ord(m.group(1)), text))
+
+
+class BulletBuffer:
+    """
+    Record bullet paragraphs and write them into a text frame in a single pass on `flush`.
+
+    The XML matches `_add_section_header`/`_add_bullet`/`_add_bullet_runs`, but the `<a:p>`
+    elements are rendered as one XML string and parsed once instead of going through
+    python-pptx proxy objects (or one lxml call per element).
+    """
+
+    __slots__ = ("_paragraphs",)
+
+    def __init__(self):
+        # (text, runs, level, size, bold): `text` goes through the paragraph-text path, `runs` through the runs path
+        # (bold=None: plain paragraph without a b attribute)
+        self._paragraphs = []
+
+    def add_section_header(self, title: str):
+        self._paragraphs.append((title, None, 0, 18, True))
+
+    def add_bullet(self, text: str, level: int = 0, size: int = 14):
+        self._paragraphs.append(("• " + text if not text.startswith("•") else text, None, level, size, False))
+
+    def add_bullet_runs(self, runs, level=0, size=14):
+        self._paragraphs.append((None, runs, level, size, False))
+
+    def add_paragraph(self, text: str, size: int):
+        """Left-aligned paragraph with only the font size set (`p.text = ...` + `run.font.size`)."""
+        self._paragraphs.append((text, None, 0, size, None))
+
+    def flush(self, tf):
+        """Append every recorded paragraph to `tf` and reset the buffer."""
+        if not self._paragraphs:
+            return
+        part = None  # resolved only when a hyperlink needs a relationship
+        frags = []
+        add, esc = frags.append, _escape_run_text
+        for text, runs, level, size, bold in self._paragraphs:
+            add(_P_OPEN_LVL % level if level else _P_OPEN)
+            if runs is None:
+                # paragraph text: '\n'/'\v' become <a:br/>, empty pieces add no run
+                sz, b = _font_attrs(size, bold)
+                for idx, piece in enumerate(_LINE_BREAK_RE.split(text)):
+                    if idx:
+                        add("<a:br/>")
+                    if piece:
+                        # bold=None: `add_paragraph` runs carry no b attribute
+                        add(_RUN_SZ_XML % (sz, esc(piece)) if bold is None else _RUN_XML % (sz, b, esc(piece)))
+            else:
+                for piece in runs:
+                    sz, b = _font_attrs(size, piece.bold)
+                    if piece.link:
+                        if part is None:
+                            part = tf.part
+                        rId = part.relate_to(piece.link, RT.HYPERLINK, is_external=True)
+                        add(_LINK_RUN_XML % (sz, b, rId, esc(piece.text)))
+                    else:
+                        add(_RUN_XML % (sz, b, esc(piece.text)))
+            add("</a:p>")
+        # un solo parse (parser de python-pptx, así los <a:p> quedan con sus clases oxml)
+        tf._txBody.extend(list(parse_xml(_FRAGMENT_XML % "".join(frags))))
+        self._paragraphs.clear()
+
+
+def _kv_line_len(item: dict) -> int:
+    """Length of `_format_kv_line(item)` without building the string."""
+    if not item:
+        return 0
+    # "k: v" per pair plus a "; " separator between pairs
+    return sum(len(str(k)) + len(str(v)) for k, v in item.items()) + 4 * len(item) - 2
+
+
+def estimate_row_height(
+    entry: dict, keys: list, line_height_pt: int, col_width_pt: float, max_lines_cap: int | None = None
+) -> float:
+    """Estimate height of the row (in points) based on text length and wrapping.
+
+    `max_lines_cap` (optional) stops counting once a cell reaches that many lines.
+    """
+    return estimate_row_heights([entry], keys, line_height_pt, col_width_pt, max_lines_cap)[0]
+
+
+def estimate_row_heights(
+    rows: list, keys: list, line_height_pt: int, col_width_pt: float, max_lines_cap: int | None = None
+) -> list[float]:
+    """`estimate_row_height` for every row; the wrap width is computed once for the whole table."""
     avg_char_width_pt = 6.0  # approx average character width at 10pt font
     chars_per_line = max(int(col_width_pt / avg_char_width_pt), 1)
-    max_lines = 1
-    for h in keys:
-        val = entry.get(h, "")
-        # count lines for this cell
-        if isinstance(val, list) and val and isinstance(val[0], dict):
-            # list of dicts: each dict becomes a line, wrapped
-            lines_i = 0
-            for item in val:
-                s = "; ".join(f"{k}: {v}" for k, v in item.items())
-                # wrap count
-                lines_i += math.ceil(len(s) / chars_per_line)
-        elif isinstance(val, list):
-            # list of primitives
+    # integer ceil: (n + cpl - 1) // cpl
+    round_up = chars_per_line - 1
+    cap = max_lines_cap if max_lines_cap is not None else sys.maxsize
+    # wrapped line count per distinct string cell ("N/A", repeated phrases); local to this call
+    str_lines = {}
+    heights = []
+    for entry in rows:
+        get = entry.get
+        max_lines = 1
+        for h in keys:
+            val = get(h, "")
+            # count lines for this cell
             lines_i = 0
-            for item in val:
-                s = str(item)
-                lines_i += math.ceil(len(s) / chars_per_line)
-        elif isinstance(val, str):
-            # split existing newlines, then wrap
-            lines_i = 0
-            for line in val.splitlines():
-                lines_i += math.ceil(len(line) / chars_per_line)
-        else:
-            # single primitive
-            s = str(val)
-            lines_i = math.ceil(len(s) / chars_per_line)
-        max_lines = max(max_lines, lines_i)
-    return max_lines * line_height_pt
+            if isinstance(val, list) and val and isinstance(val[0], dict):
+                # list of dicts: each dict becomes a line, wrapped
+                for item in val:
+                    lines_i += (_kv_line_len(item) + round_up) // chars_per_line
+                    if lines_i >= cap:
+                        break
+            elif isinstance(val, list):
+                # list of primitives
+                for item in val:
+                    lines_i += (len(str(item)) + round_up) // chars_per_line
+                    if lines_i >= cap:
+                        break
+            elif isinstance(val, str):
+                cached = str_lines.get(val)
+                if cached is None:
+                    # split existing newlines, then wrap
+                    for line in val.splitlines():
+                        lines_i += (len(line) + round_up) // chars_per_line
+                        if lines_i >= cap:
+                            break
+                    str_lines[val] = lines_i
+                else:
+                    lines_i = cached
+            else:
+                # single primitive
+                lines_i = (len(str(val)) + round_up) // chars_per_line
+            if lines_i > max_lines:
+                max_lines = lines_i
+                if max_lines >= cap:
+                    # no later cell can raise the row past the cap
+                    max_lines = cap
+                    break
+        heights.append(max_lines * line_height_pt)
+    return heights
 
 
 def _load_json(data_or_path):
     if isinstance(data_or_path, dict):
         return data_or_path
     if isinstance(data_or_path, (str, os.PathLike)):
-        with open(data_or_path, encoding="utf-8") as f:
-            return json.load(f)
+        # Raw bytes: json decodes UTF-8 in C, skipping the TextIOWrapper decode and its str copy
+        with open(data_or_path, "rb") as f:
+            raw = f.read()
+        return json.loads(raw)
     raise TypeError("Expected dict or JSON file path")
 
 
@@ -1,10 +1,14 @@
 import logging
+from bisect import bisect_right
+from copy import deepcopy
 from dataclasses import dataclass
+from itertools import accumulate, islice
 
 from pptx import Presentation
 
 # from pptx.dml.color import RGBColor
 from pptx.enum.text import MSO_AUTO_SIZE, PP_ALIGN
+from pptx.oxml.xmlchemy import OxmlElement
 from pptx.util import Pt
 
 from config import (
@@ -12,6 +16,7 @@ from config import (
     EMU_PER_INCH,
     EMU_PER_PT,
     INDUSTRY_CONTINUATION_UPLIFT_INCH,
+    INDUSTRY_MAX_SLIDES,
     MULTILINE_CONTENT_FONT_SIZE_PT,
     SIMPLE_CONTENT_FONT_SIZE_PT,
     SIMPLE_LIST_CONTENT_FONT_SIZE_PT,
@@ -22,10 +27,21 @@ from config import (
     TABLE_PARAGRAPH_FONT_SIZE_PT,
 )
 from helpers.exceptions import TemplateError
-from helpers.utils import _remove_shape_and_get_bbox, estimate_row_height, unwrap_first_data
+from helpers.utils import (
+    BulletBuffer,
+    _add_blank_slide,
+    _find_shape_with_token,
+    _format_kv_line,
+    _remove_shape_and_get_bbox,
+    estimate_row_heights,
+    unwrap_first_data,
+)
+
+# Header run size, built once (Length is an immutable int)
+_HEADER_FONT_SIZE = Pt(TABLE_PARAGRAPH_FONT_SIZE_PT)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TableDimensions:
     """Holds calculated dimensions for table layout."""
 
@@ -37,13 +53,15 @@ class TableDimensions:
     column_width_pt: float
 
 
-def fill_industry_slides(prs: Presentation, payload: dict):
+def fill_industry_slides(prs: Presentation, payload: dict, shape_index: dict | None = None):
     """
     Replace the {{IndustryResearch}} token by locating the placeholder on any slide.
     Uses payload['title'], payload['headers'], payload['rows'] (after unwrapping payload['data'][0]).
+    With payload['sort_rows_by_height'] set, rows are packed tallest-first when that needs fewer slides.
     If headers/rows are missing, it logs a warning and leaves the presentation unchanged.
+    An optional `shape_index` (see `build_shape_index`) avoids rescanning every slide.
     """
-    slide, placeholder_shape = _find_placeholder(prs, "{{IndustryResearch}}")
+    slide, placeholder_shape = _find_placeholder(prs, "{{IndustryResearch}}", shape_index)
     if not placeholder_shape:
         raise TemplateError("Token '{{IndustryResearch}}' not found in any slide")
 
@@ -73,19 +91,40 @@ def fill_industry_slides(prs: Presentation, payload: dict):
     row_heights = _calculate_row_heights(rows, headers, dimensions)
 
     chunks = _partition_rows_into_chunks(rows, row_heights, dimensions.content_height_pt)
-
+    if payload_norm.get("sort_rows_by_height"):
+        # opt-in: rows may move between slides (order kept within each slide), only if it saves a slide
+        packed = _pack_rows_by_height(rows, row_heights, dimensions.content_height_pt)
+        if len(packed) < len(chunks):
+            chunks = packed
+    if INDUSTRY_MAX_SLIDES and len(chunks) > INDUSTRY_MAX_SLIDES:
+        # pathological payloads: stop before rendering dozens of continuation slides
+        kept = chunks[:INDUSTRY_MAX_SLIDES]
+        logging.warning(
+            "IndustryResearch: truncated %d->%d rows to stay within %d slides",
+            len(rows),
+            sum(map(len, kept)),
+            INDUSTRY_MAX_SLIDES,
+        )
+        chunks = kept
+
+    header_tr = None
     for idx, chunk in enumerate(chunks):
         target_slide = _get_or_create_slide(prs, slide, layout, idx, title_text)
         # First chunk uses original bbox; continuations reclaim title space.
         top_use = top if idx == 0 else cont_top
         height_use = height if idx == 0 else cont_height
         table = _create_table(target_slide, chunk, headers, left, top_use, width, height_use)
-        _format_table_header(table, headers, dimensions, width)
+        if header_tr is None:
+            _format_table_header(table, headers, dimensions, width)
+            header_tr = table._tbl.tr_lst[0]
+        else:
+            # Headers/dimensions are the same on every slide: clone the formatted row
+            _copy_table_header(table, header_tr, width, len(headers))
         _populate_table_data(table, chunk, headers)
 
 
 # particionar filas en trozos que quepan en content_pt
-def _partition_rows_into_chunks(rows: list, row_heights: list, available_height_pt: float) -> list | None:
+def _partition_rows_into_chunks(rows: list, row_heights: list, available_height_pt: float) -> list:
     """
     Partitions rows into chunks that fit within the available height.
 
@@ -98,17 +137,14 @@ def _partition_rows_into_chunks(rows: list, row_heights: list, available_height_
         List of row chunks that fit within the height constraint
     """
     chunks = []
-    current_index = 0
     total_rows = len(rows)
+    # prefix[k] = height of rows[:k]; each chunk ends at the last prefix that still fits (heights are >= 0)
+    prefix = list(accumulate(row_heights[:total_rows], initial=0.0))
+    current_index = 0
 
     while current_index < total_rows:
-        chunk_height_used = 0.0
-        chunk_end_index = current_index
-
-        # Add rows to chunk while they fit within available height
-        while chunk_end_index < total_rows and chunk_height_used + row_heights[chunk_end_index] <= available_height_pt:
-            chunk_height_used += row_heights[chunk_end_index]
-            chunk_end_index += 1
+        limit = prefix[current_index] + available_height_pt
+        chunk_end_index = bisect_right(prefix, limit, current_index + 1) - 1
 
         # Ensure at least one row is included in each chunk
         if chunk_end_index == current_index:
@@ -120,20 +156,51 @@ def _partition_rows_into_chunks(rows: list, row_heights: list, available_height_
     return chunks
 
 
-def _find_placeholder(prs: Presentation, token: str):
+def _pack_rows_by_height(rows: list, row_heights: list, available_height_pt: float) -> list:
+    """
+    First-fit decreasing packing: tallest rows first, each into the first chunk with room.
+
+    Args:
+        rows: List of row data
+        row_heights: List of estimated heights for each row
+        available_height_pt: Available height in points
+
+    Returns:
+        List of row chunks; rows keep their original order inside a chunk and chunks are
+        ordered by their first row. A row taller than the slide still gets a chunk of its own.
+    """
+    order = sorted(range(len(rows)), key=row_heights.__getitem__, reverse=True)
+    used = []  # height used per chunk
+    members = []  # row indices per chunk
+    for i in order:
+        h = row_heights[i]
+        for c, u in enumerate(used):
+            if u + h <= available_height_pt:
+                used[c] = u + h
+                members[c].append(i)
+                break
+        else:
+            used.append(h)
+            members.append([i])
+    for m in members:
+        m.sort()
+    members.sort()
+    return [[rows[i] for i in m] for m in members]
+
+
+def _find_placeholder(prs: Presentation, token: str, shape_index: dict | None = None):
     """Find first slide and shape containing the token without removing it."""
-    for slide in prs.slides:
-        for shape in slide.shapes:
-            if getattr(shape, "has_text_frame", False) and token in shape.text_frame.text:
-                return slide, shape
-    return None, None
+    return _find_shape_with_token(prs, token, shape_index)
 
 
 def _set_slide_title(slide, payload: dict) -> str:
     """Sets the slide title from payload data. Returns the text used."""
-    if slide.shapes.title:
-        slide.shapes.title.text = payload.get("title", "")
-        return slide.shapes.title.text
+    # .title scans the placeholders: look it up once and return what was written
+    title_shape = slide.shapes.title
+    if title_shape:
+        text = payload.get("title", "")
+        title_shape.text = text
+        return text
     return ""
 
 
@@ -195,7 +262,12 @@ def _calculate_row_heights(rows: list, headers: list, dimensions: TableDimension
     Returns:
         List of estimated heights for each row
     """
-    return [estimate_row_height(row, headers, dimensions.line_height_pt, dimensions.column_width_pt) for row in rows]
+    # A row taller than the content area gets a chunk of its own whatever its exact height,
+    # so counting stops one line past what fits
+    max_lines = max(int(dimensions.content_height_pt // dimensions.line_height_pt) + 1, 1)
+    return estimate_row_heights(
+        rows, headers, dimensions.line_height_pt, dimensions.column_width_pt, max_lines_cap=max_lines
+    )
 
 
 def _get_or_create_slide(prs: Presentation, original_slide, layout, chunk_index: int, title_text: str):
@@ -214,19 +286,12 @@ def _get_or_create_slide(prs: Presentation, original_slide, layout, chunk_index:
     if chunk_index == 0:
         return original_slide
 
-    new_slide = prs.slides.add_slide(layout)
-    _clear_placeholders(new_slide)
-    # No title on continuation pages to avoid vertical gap; table stays flush to bbox.
+    # Blank slide (no layout placeholders): no title on continuation pages to avoid vertical gap;
+    # table stays flush to bbox.
+    new_slide = _add_blank_slide(prs, layout)
     return new_slide
 
 
-def _clear_placeholders(slide):
-    """Remove all placeholders from a slide (title/content) to free vertical space."""
-    for shape in list(slide.shapes):
-        if getattr(shape, "is_placeholder", False):
-            slide.shapes._spTree.remove(shape._element)
-
-
 def _create_table(slide, chunk: list, headers: list, left: int, top: int, width: int, height: int):
     """
     Creates a table on the specified slide with the given dimensions.
@@ -259,10 +324,7 @@ def _format_table_header(table, headers: list, dimensions: TableDimensions, widt
     # Set header row height
     table.rows[0].height = Pt(dimensions.header_height_pt)
 
-    # Set column widths
-    cols_count = len(headers)
-    for col in table.columns:
-        col.width = width // cols_count
+    _set_column_widths(table, width, len(headers))
 
     # Format header cells
     for col_index, header_text in enumerate(headers):
@@ -278,11 +340,35 @@ def _format_table_header(table, headers: list, dimensions: TableDimensions, widt
         paragraph.alignment = PP_ALIGN.CENTER
 
         for run in paragraph.runs:
-            run.font.size = Pt(TABLE_PARAGRAPH_FONT_SIZE_PT)
+            run.font.size = _HEADER_FONT_SIZE
             run.font.bold = True
             run.font.color.rgb = TABLE_HEADER_TEXT_COLOR
 
-        cell.text_frame.auto_size = MSO_AUTO_SIZE.TEXT_TO_FIT_SHAPE
+        _set_text_to_fit(cell.text_frame)
+
+
+def _set_column_widths(table, width: int, cols_count: int) -> None:
+    """Set every <a:gridCol> directly, then one frame-width update (col.width re-sums all columns per assignment)."""
+    column_width = width // cols_count
+    for grid_col in table._tbl.tblGrid.gridCol_lst:
+        grid_col.w = column_width
+    table.notify_width_changed()
+
+
+def _copy_table_header(table, header_tr, width: int, cols_count: int) -> None:
+    """
+    Gives a continuation table the header row already formatted on the first slide.
+
+    Args:
+        table: PowerPoint table object (fresh from _create_table)
+        header_tr: Formatted <a:tr> header row of the first table
+        width: Total table width in EMU units
+        cols_count: Number of columns
+    """
+    tbl = table._tbl
+    tbl.replace(tbl.tr_lst[0], deepcopy(header_tr))
+    table.notify_height_changed()
+    _set_column_widths(table, width, cols_count)
 
 
 def _populate_table_data(table, chunk: list, headers: list) -> None:
@@ -294,70 +380,88 @@ def _populate_table_data(table, chunk: list, headers: list) -> None:
         chunk: List of row data
         headers: List of column headers
     """
-    for row_index, entry in enumerate(chunk, start=1):
-        for col_index, header in enumerate(headers):
-            cell = table.cell(row_index, col_index)
+    # Cell paragraphs are recorded and written with one XML parse per cell
+    buf = BulletBuffer()
+    # Rows/cells are walked in order (table.cell(r, c) re-indexes the row list on every call);
+    # the cells come straight from _create_table, so there is nothing to clear()
+    for entry, row in zip(chunk, islice(table.rows, 1, None)):
+        # Row projected onto the headers once (one dict probe per column, outside the cell loop)
+        get = entry.get
+        values = [get(header, "") for header in headers]
+        for value, cell in zip(values, row.cells):
             text_frame = cell.text_frame
-            text_frame.clear()
-            text_frame.auto_size = MSO_AUTO_SIZE.TEXT_TO_FIT_SHAPE
+            _set_text_to_fit(text_frame)
+            _format_cell_content(buf, value)
+            buf.flush(text_frame)
 
-            value = entry.get(header, "")
-            _format_cell_content(text_frame, value)
 
+def _set_text_to_fit(text_frame) -> None:
+    """`auto_size = TEXT_TO_FIT_SHAPE`, appending <a:normAutofit/> directly when <a:bodyPr> is still empty."""
+    body_pr = text_frame._txBody.bodyPr
+    if len(body_pr):
+        text_frame.auto_size = MSO_AUTO_SIZE.TEXT_TO_FIT_SHAPE
+    else:
+        body_pr.append(OxmlElement("a:normAutofit"))
 
-def _format_cell_content(text_frame, value) -> None:
+
+def _format_cell_content(buf: BulletBuffer, value) -> None:
     """
-    Formats the content of a table cell based on the value type.
+    Records the paragraphs of a table cell based on the value type.
 
     Args:
-        text_frame: PowerPoint text frame object
+        buf: Buffer the cell paragraphs are added to (flushed into the cell text frame)
         value: The value to format and add to the cell
     """
-    if isinstance(value, list) and value and isinstance(value[0], dict):
-        _add_dict_list_content(text_frame, value)
-    elif isinstance(value, list):
-        _add_simple_list_content(text_frame, value)
-    elif isinstance(value, str) and "\n" in value:
-        _add_multiline_content(text_frame, value)
+    # exact JSON types go straight to their writer; subclasses take the isinstance fallback
+    writer = _CELL_WRITERS.get(type(value))
+    if writer is None:
+        if isinstance(value, list):
+            writer = _add_list_value
+        elif isinstance(value, str):
+            writer = _add_str_value
+        else:
+            _add_simple_content(buf, str(value))
+            return
+    writer(buf, value)
+
+
+def _add_list_value(buf: BulletBuffer, value: list) -> None:
+    if value and isinstance(value[0], dict):
+        _add_dict_list_content(buf, value)
     else:
-        _add_simple_content(text_frame, str(value))
+        _add_simple_list_content(buf, value)
+
 
+def _add_str_value(buf: BulletBuffer, value: str) -> None:
+    if "\n" in value:
+        _add_multiline_content(buf, value)
+    else:
+        # already text: no str() round-trip
+        _add_simple_content(buf, value)
 
-def _add_dict_list_content(text_frame, dict_list: list) -> None:
+
+def _add_dict_list_content(buf: BulletBuffer, dict_list: list) -> None:
     """Adds content for a list of dictionaries."""
     for item in dict_list:
-        line = "; ".join(f"{k}: {v}" for k, v in item.items())
-        paragraph = text_frame.add_paragraph()
-        paragraph.text = line
-        paragraph.alignment = PP_ALIGN.LEFT
-        for run in paragraph.runs:
-            run.font.size = Pt(DICT_LIST_CONTENT_FONT_SIZE_PT)
+        buf.add_paragraph(_format_kv_line(item), DICT_LIST_CONTENT_FONT_SIZE_PT)
 
 
-def _add_simple_list_content(text_frame, item_list: list) -> None:
+def _add_simple_list_content(buf: BulletBuffer, item_list: list) -> None:
     """Adds content for a simple list with bullet points."""
     for item in item_list:
-        paragraph = text_frame.add_paragraph()
-        paragraph.text = f"• {item}"
-        paragraph.alignment = PP_ALIGN.LEFT
-        for run in paragraph.runs:
-            run.font.size = Pt(SIMPLE_LIST_CONTENT_FONT_SIZE_PT)
+        buf.add_paragraph(f"• {item}", SIMPLE_LIST_CONTENT_FONT_SIZE_PT)
 
 
-def _add_multiline_content(text_frame, text: str) -> None:
+def _add_multiline_content(buf: BulletBuffer, text: str) -> None:
     """Adds content for multiline text."""
     for line in text.splitlines():
-        paragraph = text_frame.add_paragraph()
-        paragraph.text = line
-        paragraph.alignment = PP_ALIGN.LEFT
-        for run in paragraph.runs:
-            run.font.size = Pt(MULTILINE_CONTENT_FONT_SIZE_PT)
+        buf.add_paragraph(line, MULTILINE_CONTENT_FONT_SIZE_PT)
 
 
-def _add_simple_content(text_frame, text: str) -> None:
+def _add_simple_content(buf: BulletBuffer, text: str) -> None:
     """Adds simple text content."""
-    paragraph = text_frame.add_paragraph()
-    paragraph.text = text
-    paragraph.alignment = PP_ALIGN.LEFT
-    for run in paragraph.runs:
-        run.font.size = Pt(SIMPLE_CONTENT_FONT_SIZE_PT)
+    buf.add_paragraph(text, SIMPLE_CONTENT_FONT_SIZE_PT)
+
+
+# Cell writers keyed by exact value type (see _format_cell_content)
+_CELL_WRITERS = {list: _add_list_value, str: _add_str_value}
@@ -2,9 +2,11 @@
 import json
 import os
 import sys
+from io import BytesIO
 from unittest.mock import Mock
 
 import azure.functions as func
+from azure.core.exceptions import ResourceNotFoundError
 
 # Ensure project root is on sys.path so tests can import top-level modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -77,3 +79,31 @@ def test_invalid_json_returns_400():
     req = func.HttpRequest(method="POST", body=b"not-json", url="/api/agent_httptrigger")
     resp = fa.agent_httptrigger(req)
     assert resp.status_code == 400
+
+
+def test_upload_creates_missing_container_and_retries(monkeypatch):
+    positions = []
+
+    def upload_blob(data, **kwargs):
+        # first upload consumes the stream and fails as if the container did not exist yet
+        positions.append(data.tell())
+        data.read()
+        if len(positions) == 1:
+            raise ResourceNotFoundError("ContainerNotFound")
+
+    blob_client = Mock()
+    blob_client.account_name = "acct"
+    blob_client.upload_blob = Mock(side_effect=upload_blob)
+
+    container_mock = Mock()
+    container_mock.get_blob_client.return_value = blob_client
+    monkeypatch.setattr(fa, "_get_container_client", lambda: container_mock)
+
+    url = fa._upload_presentation_to_blob(BytesIO(b"pptx-bytes"), "out.pptx")
+
+    container_mock.create_container.assert_called_once()
+    assert blob_client.upload_blob.call_count == 2
+    # the retry starts again from the beginning of the stream, with the same length
+    assert positions == [0, 0]
+    assert all(call.kwargs["length"] == len(b"pptx-bytes") for call in blob_client.upload_blob.call_args_list)
+    assert url.endswith("/out.pptx")
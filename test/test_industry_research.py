@@ -0,0 +1,65 @@
+# tests/test_industry_research.py
+import logging
+import os
+import sys
+
+from pptx import Presentation
+
+# Ensure project root is on sys.path so tests can import top-level modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import industry_research as ir
+from config import INPUT_TEMPLATE
+
+
+def _fill(monkeypatch, heights, **payload_extra):
+    """Render rows r0..rN with fixed heights, given as fractions of the table content height."""
+    monkeypatch.setattr(
+        ir, "_calculate_row_heights", lambda rows, headers, dims: [h * dims.content_height_pt for h in heights]
+    )
+    prs = Presentation(INPUT_TEMPLATE)
+    slides_before = len(prs.slides)
+    payload = {"title": "T", "headers": ["A", "B"], "rows": [{"A": f"r{i}", "B": "x"} for i in range(len(heights))]}
+    ir.fill_industry_slides(prs, {**payload, **payload_extra})
+    # first column of every table row below the header, one list per table slide
+    tables = [shape.table for slide in prs.slides for shape in slide.shapes if shape.has_table]
+    chunks = [[row.cells[0].text.strip() for row in list(table.rows)[1:]] for table in tables]
+    return len(prs.slides) - slides_before, chunks
+
+
+def test_pack_rows_by_height():
+    rows = ["r0", "r1", "r2", "r3", "r4"]
+
+    # tallest first: r1 is taller than the slide and stays alone; the rest fill the first chunk with room
+    chunks = ir._pack_rows_by_height(rows, [3, 15, 4, 2, 6], 10)
+
+    assert chunks == [["r0", "r3"], ["r1"], ["r2", "r4"]]
+    assert sorted(r for chunk in chunks for r in chunk) == rows
+    assert all(chunk == sorted(chunk) for chunk in chunks)
+
+
+def test_sort_rows_by_height_only_when_it_saves_a_slide(monkeypatch):
+    # in order: [r0], [r1, r2], [r3]; packed: [r0, r3], [r1, r2]
+    added, chunks = _fill(monkeypatch, [0.48, 0.57, 0.38, 0.48], sort_rows_by_height=True)
+    assert (added, chunks) == (1, [["r0", "r3"], ["r1", "r2"]])
+
+    # packing gives two slides either way ([r0, r1], [r2, r3] in order): rows keep their order
+    added, chunks = _fill(monkeypatch, [0.28, 0.57, 0.38, 0.48], sort_rows_by_height=True)
+    assert (added, chunks) == (1, [["r0", "r1"], ["r2", "r3"]])
+
+
+def test_max_slides_truncates_rows(monkeypatch, caplog):
+    # every row is taller than the table, so each one needs its own slide
+    monkeypatch.setattr(ir, "INDUSTRY_MAX_SLIDES", 3)
+    with caplog.at_level(logging.WARNING):
+        added, chunks = _fill(monkeypatch, [1.5] * 10)
+
+    assert added == 2
+    assert chunks == [["r0"], ["r1"], ["r2"]]
+    assert "truncated 10->3 rows to stay within 3 slides" in caplog.text
+
+    # 0 disables the cap
+    monkeypatch.setattr(ir, "INDUSTRY_MAX_SLIDES", 0)
+    added, chunks = _fill(monkeypatch, [1.5] * 10)
+    assert added == 9
+    assert chunks == [[f"r{i}"] for i in range(10)]
@@ -0,0 +1,80 @@
+# tests/test_utils.py
+import os
+import sys
+
+from pptx import Presentation
+from pptx.enum.text import PP_ALIGN
+from pptx.util import Inches, Pt
+
+# Ensure project root is on sys.path so tests can import top-level modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import INPUT_TEMPLATE
+from helpers.utils import (
+    BulletBuffer,
+    Run,
+    _add_bullet,
+    _add_bullet_runs,
+    _add_section_header,
+    _find_shape_with_token,
+    build_shape_index,
+    estimate_row_height,
+    estimate_row_heights,
+)
+
+
+def test_shape_index_matches_slide_scan():
+    prs = Presentation(INPUT_TEMPLATE)
+    index = build_shape_index(prs)
+
+    for token in ("{{CompanyName}}", "{{CompanyResearch1}}", "{{IndustryResearch}}"):
+        assert _find_shape_with_token(prs, token, index) == _find_shape_with_token(prs, token)
+
+    assert _find_shape_with_token(prs, "{{Missing}}", index) == (None, None)
+
+
+def test_row_heights_batch_matches_single_rows():
+    rows = [{"A": "x" * 25, "B": 1}, {"A": "a\nb\nc\nd"}, {"B": [{"k": "value"}, {"k": "v"}]}, {}]
+    keys = ["A", "B"]
+
+    # 60pt columns wrap at 10 chars per line; empty rows still take one line
+    assert estimate_row_heights(rows, keys, 12, 60) == [36, 48, 24, 12]
+    assert estimate_row_heights(rows, keys, 12, 60) == [estimate_row_height(r, keys, 12, 60) for r in rows]
+    assert estimate_row_heights(rows, keys, 12, 60, max_lines_cap=2) == [24, 24, 24, 12]
+
+
+def test_bullet_buffer_matches_python_pptx_paragraphs():
+    texts = ["a & b < c > d", "line1\nline2\vline3", "ctrl\x01\x1fchars", ""]
+    runs = [Run("see "), Run("SEC <10-K>", link="https://www.sec.gov/a?b=1&c=2", bold=True), Run(".")]
+    prs = Presentation()
+    ref_slide, buf_slide = (prs.slides.add_slide(prs.slide_layouts[6]) for _ in range(2))
+    ref_tf, buf_tf = (s.shapes.add_textbox(0, 0, Inches(4), Inches(4)).text_frame for s in (ref_slide, buf_slide))
+
+    _add_section_header(ref_tf, "Header & <title>")
+    for level, text in enumerate(texts):
+        _add_bullet(ref_tf, text, level=level, size=12)
+    _add_bullet_runs(ref_tf, runs, level=1)
+    for text in texts:
+        # reference for add_paragraph: the table-cell writers before BulletBuffer
+        p = ref_tf.add_paragraph()
+        p.text = text
+        p.alignment = PP_ALIGN.LEFT
+        for run in p.runs:
+            run.font.size = Pt(10)
+
+    buf = BulletBuffer()
+    buf.add_section_header("Header & <title>")
+    for level, text in enumerate(texts):
+        buf.add_bullet(text, level=level, size=12)
+    buf.add_bullet_runs(runs, level=1)
+    for text in texts:
+        buf.add_paragraph(text, 10)
+    buf.flush(buf_tf)
+
+    assert buf_tf._txBody.xml == ref_tf._txBody.xml
+    assert "_x0001__x001F_" in buf_tf._txBody.xml and "<a:br/>" in buf_tf._txBody.xml
+    ref_rels, buf_rels = (
+        sorted((r.rId, r.reltype, r.target_ref) for r in s.part.rels.values()) for s in (ref_slide, buf_slide)
+    )
+    assert buf_rels == ref_rels
+    assert any(t == runs[1].link for _, _, t in buf_rels)